@@ -0,0 +1,39 @@
+import argparse
+import asyncio
+import json
+import uuid
+from pathlib import Path
+
+import main
+from utils.batch import Batch, BatchRunner
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Analyse a directory or manifest of videos and images, writing one result row per file. "
+                    "Running it again with the same output resumes an interrupted batch.")
+    parser.add_argument("source", help="directory to scan, or a manifest (one path per line, or JSONL)")
+    parser.add_argument("--output", required=True, help="results file (.jsonl or .parquet)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"],
+                        help="output format; defaults to the output file's extension")
+    parser.add_argument("--workers", type=int, help="files analysed at once (default BATCH_WORKERS)")
+    parser.add_argument("--user-id", default="batch", help="user the analysis sessions are recorded under")
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> Batch:
+    output = Path(args.output).expanduser().resolve()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    batch = Batch(id=str(uuid.uuid4()), source=args.source, output=output, user_id=args.user_id,
+                  output_format=args.format or ("parquet" if output.suffix == ".parquet" else "jsonl"))
+    runner = BatchRunner(analyse=main.analyse_batch_file)
+    if args.workers:
+        runner.workers = args.workers
+    # Same agents, sessions and limits as the API server, without serving HTTP
+    async with main.lifespan(main.app):
+        await runner.run(batch)
+    return batch
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(run(parse_args())).to_dict(), indent=2))
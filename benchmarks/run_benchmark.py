@@ -0,0 +1,202 @@
+"""Offline load test: stub LLM, the multi-agent A2A server and a SQLite registry driving /upload_video.
+
+Usage:
+    python -m benchmarks.run_benchmark --requests 20 --concurrency 4 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import uvicorn
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_VIDEO = os.path.join(PROJECT_ROOT, "artifacts", "welding 11.mp4")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=12, help="total uploads to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="uploads in flight at once")
+    parser.add_argument("--endpoint", default="/upload_video", help="endpoint under test")
+    parser.add_argument("--video", default=DEFAULT_VIDEO, help="media file to upload")
+    parser.add_argument("--mime-type", default="video/mp4")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub model latency in seconds")
+    parser.add_argument("--llm-tokens", type=int, default=200, help="stub completion tokens per call")
+    parser.add_argument("--llm-capacity", type=int, default=0,
+                        help="stub model answers 429 beyond this many concurrent calls (0: unlimited)")
+    parser.add_argument("--repeat-content", action="store_true",
+                        help="upload identical bytes every time (measures the cache path)")
+    parser.add_argument("--orchestration-mode", default="workflow", choices=["workflow", "llm"])
+    parser.add_argument("--analysis-mode", default="per_agent", choices=["per_agent", "combined"],
+                        help="one model call per hazard agent, or one combined call for all categories")
+    parser.add_argument("--transport", default="direct", choices=["direct", "mcp"],
+                        help="how the root agent reaches the registry and specialized agents")
+    parser.add_argument("--app-port", type=int, default=18080)
+    parser.add_argument("--agents-port", type=int, default=18000)
+    parser.add_argument("--agent-replicas", type=int, default=1,
+                        help="agent servers to run on consecutive ports from --agents-port; extra ones join by heartbeat")
+    parser.add_argument("--llm-port", type=int, default=18090)
+    parser.add_argument("--registry-port", type=int, default=8181,
+                        help="MCP registry port; the root agent connects to localhost:8181")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace, workdir: str):
+    # Must run before any project module is imported: they read these at import time
+    os.environ.update({
+        "LLM_MODEL": "openai/stub-model",
+        "OPENAI_API_BASE": f"http://127.0.0.1:{args.llm_port}/v1",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "OPENAI_API_KEY": "stub",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'sessions.db')}",
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+        "RESULT_CACHE_PATH": os.path.join(workdir, "result_cache.sqlite3"),
+        "ORCHESTRATION_MODE": args.orchestration_mode,
+        "A2A_TRANSPORT": args.transport,
+        "ANALYSIS_MODE": args.analysis_mode,
+        "COMBINED_AGENT_URL": f"http://127.0.0.1:{args.agents_port}/a2a/multi_hazard_agent",
+        "AGENT_HEARTBEAT_SECONDS": "2",
+    })
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+async def serve(app, port: int) -> tuple[uvicorn.Server, asyncio.Task]:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                            timeout_graceful_shutdown=5))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+async def upload(client: httpx.AsyncClient, args: argparse.Namespace, index: int, body: bytes) -> httpx.Response:
+    return await client.post(args.endpoint, params={"user_id": f"bench-{index}"},
+                             files={"file": (f"bench-{index}.mp4", body, args.mime_type)})
+
+
+async def drive(args: argparse.Namespace, payload: bytes) -> tuple[list[float], int, float]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.app_port}", timeout=None) as client:
+        # One unmeasured request first: it creates the session app row and warms imports and agent cards,
+        # which would otherwise race between the first concurrent requests
+        warmup = await upload(client, args, -1, payload + uuid.uuid4().bytes)
+        if warmup.status_code >= 400:
+            print(f"warm-up request failed: {warmup.status_code} {warmup.text[:200]}", file=sys.stderr)
+
+        async def one_request(index: int):
+            nonlocal failures
+            # Unique trailing bytes give every upload its own content hash unless caching is under test
+            body = payload if args.repeat_content else payload + uuid.uuid4().bytes
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await upload(client, args, index, body)
+                except httpx.HTTPError as e:
+                    failures += 1
+                    print(f"request {index} failed: {type(e).__name__}: {e}", file=sys.stderr)
+                    return
+                elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                failures += 1
+                print(f"request {index} failed: {response.status_code} {response.text[:200]}", file=sys.stderr)
+            else:
+                latencies.append(elapsed)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request(index) for index in range(args.requests)))
+        wall_time = time.perf_counter() - start
+
+    return latencies, failures, wall_time
+
+
+async def run(args: argparse.Namespace, workdir: str) -> dict:
+    from benchmarks.stub_registry import SqliteAgentRegistry, create_stub_registry
+    from benchmarks.stub_llm import create_stub_llm_app
+    from specialized_agents.server import create_app as create_agents_app
+
+    agents_apps = [create_agents_app(f"http://127.0.0.1:{args.agents_port + index}")
+                   for index in range(args.agent_replicas)]
+    agents = agents_apps[0].state.agents
+    registry = SqliteAgentRegistry(os.path.join(workdir, "registry.sqlite3"), agents)
+
+    llm_app = create_stub_llm_app(args.llm_latency, args.llm_tokens, args.llm_capacity)
+    servers = [
+        await serve(llm_app, args.llm_port),
+        *[await serve(agents_app, args.agents_port + index) for index, agents_app in enumerate(agents_apps)],
+        await serve(create_stub_registry(registry, "127.0.0.1", args.registry_port).sse_app(), args.registry_port),
+    ]
+
+    import main
+    servers.append(await serve(main.app, args.app_port))
+    # The direct transport reads the registry in-process; it only connects on first use, so swapping is safe
+    main.host_agent.registry = registry
+
+    with open(args.video, "rb") as f:
+        payload = f.read()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    latencies, failures, wall_time = await drive(args, payload)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    for server, task in reversed(servers):
+        server.should_exit = True
+        await task
+
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "endpoint": args.endpoint,
+        "transport": args.transport,
+        "analysis_mode": args.analysis_mode,
+        "agents": len(agents),
+        "agent_replicas": args.agent_replicas,
+        "llm_latency_seconds": args.llm_latency,
+        "llm_rejected_429": llm_app.state.rejected,
+        "failures": failures,
+        "wall_time_seconds": round(wall_time, 3),
+        "throughput_rps": round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+        "peak_rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+        "peak_rss_growth_per_request_kb": round((rss_after - rss_before) / max(args.requests, 1), 1),
+    }
+    if latencies:
+        report.update({
+            "latency_mean_seconds": round(statistics.mean(latencies), 3),
+            "latency_p50_seconds": round(percentile(latencies, 0.5), 3),
+            "latency_p95_seconds": round(percentile(latencies, 0.95), 3),
+            "latency_p99_seconds": round(percentile(latencies, 0.99), 3),
+        })
+    return report
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="vra-bench-") as workdir:
+        configure_environment(args, workdir)
+        report = asyncio.run(run(args, workdir))
+
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_stub_llm_app(latency: float = 1.0, completion_tokens: int = 200, capacity: int = 0) -> FastAPI:
+    """OpenAI-compatible chat completions endpoint that answers after a fixed latency with a canned report.
+
+    With a capacity, requests beyond that many in flight get a 429 with Retry-After, like an overloaded server.
+    app.state.rejected counts them.
+    """
+    app = FastAPI()
+    app.state.rejected = 0
+    in_flight = 0
+
+    def completion_text(messages: list) -> str:
+        # Roughly one token per word keeps completion_tokens meaningful for the model callbacks
+        filler = " ".join(["observation"] * max(completion_tokens - 20, 0))
+        findings = [{"category": "stub", "description": "Stub hazard", "severity": "low", "timestamp": 0.0,
+                     "recommendation": filler}]
+        # Replies follow utils.hazard_schema, which the agents enforce through output_schema
+        match = re.search(r"hazards in these categories: ([\w, ]+)", json.dumps(messages))
+        if match:
+            return json.dumps({"reports": [{"agent": category.strip(), "findings": findings}
+                                           for category in match.group(1).split(",")]})
+        return json.dumps({"agent": "stub", "findings": findings, "summary": "Stub report"})
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        nonlocal in_flight
+        body = await request.json()
+        if capacity and in_flight >= capacity:
+            app.state.rejected += 1
+            return JSONResponse({"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                                status_code=429, headers={"Retry-After": str(latency)})
+        in_flight += 1
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            in_flight -= 1
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        content = completion_text(body.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model", "stub")}
+
+        if body.get("stream"):
+            async def chunks():
+                delta = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"role": "assistant", "content": content},
+                                      "finish_reason": None}]}
+                yield f"data: {json.dumps(delta)}\n\n"
+                done = {**base, "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        return JSONResponse({**base, "object": "chat.completion",
+                             "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                          "finish_reason": "stop"}],
+                             "usage": usage})
+
+    return app
@@ -0,0 +1,67 @@
+import json
+import sqlite3
+import time
+
+from mcp.server import FastMCP
+
+
+class SqliteAgentRegistry:
+    """Stand-in for mcp_server.registry.AgentRegistry that needs no Postgres."""
+
+    def __init__(self, db_path: str, agents: list[dict], replica_ttl: float = 30.0):
+        self.db_path = db_path
+        self.replica_ttl = replica_ttl
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS agents (agent_name TEXT PRIMARY KEY, agent_uri TEXT, agent_version TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS agent_replicas (agent_name TEXT, replica_uri TEXT, "
+                         "load REAL DEFAULT 0, last_heartbeat REAL, PRIMARY KEY (agent_name, replica_uri))")
+            conn.executemany("INSERT OR REPLACE INTO agents VALUES (?, ?, ?)",
+                             [(agent["name"], agent["uri"], agent["version"]) for agent in agents])
+            conn.executemany("INSERT OR IGNORE INTO agent_replicas (agent_name, replica_uri) VALUES (?, ?)",
+                             [(agent["name"], agent["uri"]) for agent in agents])
+
+    async def list_agents(self) -> list[dict]:
+        from mcp_server.registry import replica_weight
+
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("SELECT agent_name, agent_uri, agent_version FROM agents").fetchall()
+            replicas = conn.execute("SELECT agent_name, replica_uri, load FROM agent_replicas "
+                                    "WHERE last_heartbeat IS NULL OR last_heartbeat > ? ORDER BY replica_uri",
+                                    (time.time() - self.replica_ttl,)).fetchall()
+        return [{"name": name, "uri": uri, "version": version,
+                 "replicas": [{"uri": replica_uri, "weight": replica_weight(None), "load": load}
+                              for agent_name, replica_uri, load in replicas if agent_name == name]}
+                for name, uri, version in rows]
+
+    async def heartbeat(self, agent_name: str, replica_uri: str, load: float = 0.0) -> bool:
+        with sqlite3.connect(self.db_path) as conn:
+            if conn.execute("SELECT 1 FROM agents WHERE agent_name = ?", (agent_name,)).fetchone() is None:
+                return False
+            conn.execute("INSERT OR REPLACE INTO agent_replicas VALUES (?, ?, ?, ?)",
+                         (agent_name, replica_uri, load, time.time()))
+        return True
+
+    async def close(self):
+        pass
+
+
+def create_stub_registry(registry: SqliteAgentRegistry, host: str, port: int) -> FastMCP:
+    """MCP server with the production tool names over the SQLite registry."""
+    from mcp_server.a2a_client.resilience import delegate_to_agent
+
+    server = FastMCP("Benchmark registry", host=host, port=port)
+
+    @server.tool(description="List all registered agents from DB", name="list_registered_agents")
+    async def list_registered_agents() -> dict:
+        return json.dumps(await registry.list_agents())
+
+    @server.tool(description="Register a running replica of an agent and report its load", name="agent_heartbeat")
+    async def agent_heartbeat(agent_name: str, agent_uri: str, load: float = 0.0) -> str:
+        return "ok" if await registry.heartbeat(agent_name, agent_uri, load) else f"Agent {agent_name} is not registered"
+
+    @server.tool(description="Delegate Request To Agent", name="agent_executor")
+    async def agent_executor(file_uri: str, agent_url: str, mime_type: str, trace_context: dict = None,
+                             priority: int = 0, replicas: list[dict] = None):
+        return await delegate_to_agent(file_uri, agent_url, mime_type, replicas=replicas)
+
+    return server
@@ -1,37 +1,53 @@
+import asyncio
+import json
 import os
-import shutil
+import time
 from contextlib import asynccontextmanager
 
 from google.genai.types import Part, Content, FileData
 
 import google.adk.sessions
 import uvicorn
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from google.adk import Runner
 from google.adk.artifacts import FileArtifactService
-from google.adk.memory import InMemoryMemoryService
 from google.adk.sessions.database_session_service import DatabaseSessionService
 
-from root_agent.agent import HostAgent
+from root_agent.agent import HostAgent, RegistryUnavailableError
+from utils.batch import BatchManager, BatchRunner
+from utils.hazard_schema import merge_reports, merge_segment_reports
+from utils.job_queue import Job, JobManager
+from utils.llm_limiter import Priority, llm_priority
+from utils.media_normalizer import media_normalizer
+from utils.media_store import CHUNK_SIZE, MediaRef, media_store
+from utils.session_retention import BoundedMemoryService, RetentionSessionService
+from utils.stream_monitor import StreamManager
+from utils.telemetry import extract_trace_context, metrics, setup_tracing, traced, tracer
+from utils.video_segmenter import SEGMENT_SET_MIME_TYPE, load_segment_set
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterator, Callable, Optional
 
-from google.genai.types import Blob
+setup_tracing("root-agent")
 
 # Initialize services at module level
-session_service = DatabaseSessionService(db_url=os.getenv("DATABASE_URL"))
-memory_service = InMemoryMemoryService()
+memory_service = BoundedMemoryService()
+session_service = RetentionSessionService(DatabaseSessionService(db_url=os.getenv("DATABASE_URL")),
+                                          memory_service=memory_service)
 artifacts_service = FileArtifactService(root_dir=os.getenv("ARTIFACT_DIR","artifacts"))
 
 # Global variables for agent and runner (will be initialized in lifespan)
+host_agent: HostAgent
 root_agent = None
 runner : Runner
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize async components
-    global root_agent, runner
+    global host_agent, root_agent, runner
     host_agent = HostAgent()
+    await host_agent.start()
     root_agent = await host_agent.create_agent()
     runner = Runner(
         app_name=root_agent.name,
@@ -40,41 +56,366 @@ async def lifespan(app: FastAPI):
         memory_service=memory_service,
         artifact_service=artifacts_service,
     )
+    await job_manager.start()
+    await session_service.start()
+    await media_store.start()
     yield
     # Shutdown: Clean up resources if needed
-    pass
+    await batch_manager.stop()
+    await stream_manager.stop()
+    await session_service.stop()
+    await media_store.stop()
+    await job_manager.stop()
+    await host_agent.close()
 
 # Create the main FastAPI app with lifespan
 app = FastAPI(lifespan=lifespan)
 
+
+class TraceRequestsMiddleware:
+    """Pure ASGI middleware: unlike @app.middleware it runs the request in the caller's task, so the request
+    span stays current for the whole handler and streamed responses pass through without buffering."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        start = time.perf_counter()
+        with tracer.start_as_current_span(f"{request.method} {request.url.path}",
+                                          context=extract_trace_context(dict(request.headers))) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # Label by route template so ids in the path do not create a series per request
+                route = scope.get("route")
+                metrics.observe("http_request_duration_seconds", time.perf_counter() - start,
+                                method=request.method, path=getattr(route, "path", request.url.path))
+
+
+app.add_middleware(TraceRequestsMiddleware)
+
+
+@app.exception_handler(RegistryUnavailableError)
+async def registry_unavailable(request: Request, e: RegistryUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": f"Agent registry unavailable: {e}"},
+                        headers={"Retry-After": "30"})
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render())
+
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iter_upload_file(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def analyse_media(user_id: str, media: MediaRef,
+                        on_event: Optional[Callable[[google.adk.events.Event], None]] = None):
+    # Shrink the upload once to the payload budget (one image or a keyframe set) instead of sending the
+    # original resolution to every agent
+    frames: MediaRef = await media_normalizer.normalize(media)
+    session: google.adk.sessions.Session = await session_service.create_session(user_id=user_id,
+                                                                                app_name=root_agent.name, state={
+            'mime_type': frames.mime_type,
+            'file_uri': frames.uri,
+            'source_uri': media.uri,
+            'content_sha256': media.sha256
+        })
+    with traced('runner.run_async', 'runner_duration_seconds', app=root_agent.name):
+        final_parts = await run_root_agent(session, on_event)
+
+    if final_parts is not None:
+        print(f'final response {final_parts}')
+        return final_parts
+    return {"info": f"media stored at '{media.uri}'"}
+
+
+async def run_root_agent(session: google.adk.sessions.Session,
+                         on_event: Optional[Callable[[google.adk.events.Event], None]] = None):
+    response : AsyncGenerator[google.adk.events.Event] = runner.run_async(user_id=session.user_id,
+                                                                                session_id=session.id,
+                                                                                new_message=Content(
+                                                                                    role="user",
+                                                                                    parts=[
+                                                                                        Part(text="Analyse Video")
+                                                                                    ]
+                                                                                )
+                                                                                )
+
+    # Drain the whole run so the runner can finish and persist its events
+    final_parts = None
+    async for event in response:
+        if on_event is not None:
+            on_event(event)
+        # In workflow mode the final response is authored by the consolidator, not the root agent
+        if event.is_final_response() and event.content and event.content.parts:
+            final_parts = event.content.parts
+    return final_parts
+
+
+async def run_analysis_job(job: Job):
+    # Queued jobs have no caller waiting on the response, so their model calls yield to interactive uploads
+    llm_priority.set(Priority.BATCH)
+
+    def on_event(event: google.adk.events.Event):
+        job_manager.publish(job, "progress", {"author": event.author, "final": event.is_final_response()})
+
+    parts = await analyse_media(job.payload['user_id'], job.payload['media'], on_event)
+    return jsonable_encoder(parts, exclude_none=True)
+
+
+job_manager = JobManager(handler=run_analysis_job)
+
+
+def job_queue_full() -> HTTPException:
+    return HTTPException(status_code=429, detail="Job queue is full", headers={"Retry-After": "30"})
+
+
 @app.post("/upload_video")
 async def upload_video(user_id:str,file: UploadFile = File(...)):
+    # Stream the upload to disk while hashing it; agents receive a reference, never the bytes
+    media: MediaRef = await media_store.ingest(iter_upload_file(file), file.content_type)
+    return await analyse_media(user_id, media)
 
-    file_location = f"artifacts/{file.filename}"
-    os.makedirs("artifacts", exist_ok=True)
-    with open(file_location, "wb+") as file_object:
-        shutil.copyfileobj(file.file, file_object)
-        session: google.adk.sessions.Session = await session_service.create_session(user_id=user_id,
-                                                                                    app_name=root_agent.name, state={
-                'mime_type': file.content_type,
-                'file_path': file_location
-            })
-        response : AsyncGenerator[google.adk.events.Event] = runner.run_async(user_id=session.user_id,
-                                                                                    session_id=session.id,
-                                                                                    new_message=Content(
-                                                                                        role="user",
-                                                                                        parts=[
-                                                                                            Part(text="Analyse Video"),
-                                                                                            Part(inline_data=Blob(mime_type=file.content_type, data=open(file_location,'rb').read()))
-                                                                                        ]
-                                                                                    )
-                                                                                    )
 
-    async for event in response:
-        if event.author == root_agent.name and event.is_final_response():
-            print(f'final response {event.content.parts}')
-            return event.content.parts
-    return {"info": f"file '{file.filename}' saved at '{file_location}'"}
+@app.post("/upload_video/stream")
+async def upload_video_stream(user_id: str, file: UploadFile = File(...)):
+    media: MediaRef = await media_store.ingest(iter_upload_file(file), file.content_type)
+
+    async def event_stream():
+        # Relay each agent's findings as they arrive, then merge the reports they carried into the final one.
+        # The 200 is already sent, so any failure is reported in the stream
+        try:
+            frames: MediaRef = await media_normalizer.normalize(media)
+            results: dict[str, dict] = {}
+            segments: dict[str, list[tuple[dict, dict]]] = {}
+            async for finding in host_agent.stream_all_agents(frames.uri, frames.mime_type):
+                yield format_sse("finding", finding)
+                report = HostAgent.finding_report(finding)
+                if report is None:
+                    continue
+                if 'segment' in finding:
+                    segments.setdefault(finding['agent'], []).append((finding['segment'], report))
+                else:
+                    results[finding['agent']] = report
+            if segments:
+                segment_set = await asyncio.to_thread(load_segment_set, frames.uri)
+                results = {name: merge_segment_reports(name, reports, segment_set['overlap_seconds'])
+                           for name, reports in segments.items()}
+            yield format_sse("report", merge_reports(results, timeline=frames.mime_type == SEGMENT_SET_MIME_TYPE))
+        except RegistryUnavailableError as e:
+            yield format_sse("error", {"detail": f"Agent registry unavailable: {e}"})
+        except Exception as e:
+            yield format_sse("error", {"detail": f"{type(e).__name__}: {e}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+async def analyse_stream_window(file_uri: str, mime_type: str) -> dict:
+    # Monitoring only needs the agents' findings to raise alerts, not a consolidated report per window
+    return await host_agent.execute_all_agents(file_uri, mime_type)
+
+
+stream_manager = StreamManager(handler=analyse_stream_window)
+
+
+@app.post("/streams", status_code=201)
+async def start_stream(source: str, push_url: Optional[str] = None, push_token: Optional[str] = None,
+                       replay: bool = False):
+    # replay plays a file from the artifact directory back in real time, standing in for a camera
+    try:
+        stream = await stream_manager.start_stream(source, push_url, push_token, replay)
+    except RuntimeError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return stream.to_dict()
+
+
+@app.get("/streams")
+async def list_streams():
+    return [stream.to_dict() for stream in stream_manager.streams.values()]
+
+
+@app.get("/streams/{stream_id}")
+async def stream_status(stream_id: str):
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail=f"Unknown stream {stream_id}")
+    return stream.to_dict()
+
+
+@app.delete("/streams/{stream_id}")
+async def stop_stream(stream_id: str):
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail=f"Unknown stream {stream_id}")
+    await stream_manager.stop_stream(stream)
+    return stream.to_dict()
+
+
+async def analyse_batch_file(user_id: str, media: MediaRef):
+    # Archive back-audits yield to interactive uploads, like queued jobs
+    llm_priority.set(Priority.BATCH)
+    succeeded_agents = None
+
+    def capture(event: google.adk.events.Event):
+        nonlocal succeeded_agents
+        succeeded_agents = event.actions.state_delta.get('succeeded_agents', succeeded_agents)
+
+    parts = await analyse_media(user_id, media, on_event=capture)
+    # A report built only from agent errors is a failed row, so a resumed batch tries the file again. The LLM
+    # orchestration mode does not record which agents answered and is taken at its word.
+    if succeeded_agents is not None and not succeeded_agents:
+        raise RuntimeError("No agent analysed the file")
+    return jsonable_encoder(parts, exclude_none=True)
+
+
+batch_manager = BatchManager(BatchRunner(analyse=analyse_batch_file))
+
+
+@app.post("/batches", status_code=202)
+async def submit_batch(user_id: str, source: str, output: str, format: str = "jsonl"):
+    # source is a directory or manifest and output a results file, both under BATCH_ROOT; resubmitting the same
+    # output resumes it
+    try:
+        batch = batch_manager.submit(source, output, format, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return batch.to_dict()
+
+
+@app.get("/batches")
+async def list_batches():
+    return [batch.to_dict() for batch in batch_manager.batches.values()]
+
+
+@app.get("/batches/{batch_id}")
+async def batch_status(batch_id: str):
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch {batch_id}")
+    return batch.to_dict()
+
+
+@app.get("/batches/{batch_id}/results")
+async def batch_results(batch_id: str):
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch {batch_id}")
+    if batch.output_format != "jsonl":
+        raise HTTPException(status_code=409, detail="Only JSONL results can be streamed")
+    return StreamingResponse(batch_manager.follow(batch), media_type="application/x-ndjson")
+
+
+@app.delete("/batches/{batch_id}")
+async def cancel_batch(batch_id: str):
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch {batch_id}")
+    await batch_manager.cancel(batch)
+    return batch.to_dict()
+
+
+@app.post("/uploads")
+async def begin_upload():
+    return {"upload_id": await media_store.begin_upload()}
+
+
+@app.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    try:
+        return {"upload_id": upload_id, "offset": media_store.upload_offset(upload_id)}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int = 0):
+    try:
+        return {"upload_id": upload_id, "offset": await media_store.append_chunks(upload_id, offset, request.stream())}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, user_id: str, mime_type: str):
+    try:
+        media: MediaRef = await media_store.complete_upload(upload_id, mime_type)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return await analyse_media(user_id, media)
+
+
+@app.post("/uploads/{upload_id}/jobs", status_code=202)
+async def complete_upload_as_job(upload_id: str, user_id: str, mime_type: str):
+    # The queue slot is held before the upload is completed: refused, the upload stays resumable
+    try:
+        with job_manager.reserve() as submit:
+            try:
+                media: MediaRef = await media_store.complete_upload(upload_id, mime_type)
+            except FileNotFoundError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+            job = submit(user_id=user_id, media=media)
+    except asyncio.QueueFull:
+        raise job_queue_full()
+    return {"job_id": job.id, "status": job.status.value}
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(user_id: str, file: UploadFile = File(...)):
+    # Reject before reading the upload when there is no room to run it
+    try:
+        with job_manager.reserve() as submit:
+            media: MediaRef = await media_store.ingest(iter_upload_file(file), file.content_type)
+            job = submit(user_id=user_id, media=media)
+    except asyncio.QueueFull:
+        raise job_queue_full()
+    return {"job_id": job.id, "status": job.status.value}
+
+
+@app.get("/jobs")
+async def job_stats():
+    return job_manager.stats()
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+
+    async def event_stream():
+        async for message in job_manager.subscribe(job):
+            yield format_sse(message['event'], message['data'])
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 if __name__ == "__main__":
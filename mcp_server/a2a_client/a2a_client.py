@@ -1,40 +1,102 @@
-import json
-import sys
 import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 import a2a.types
 import httpx
 from a2a.client import A2AClient, A2ACardResolver
-from a2a.types import SendMessageRequest, SendMessageResponse, SendMessageSuccessResponse, Task
+from a2a.types import (AgentCard, GetTaskRequest, GetTaskResponse, SendMessageRequest, SendMessageResponse,
+                        SendMessageSuccessResponse, SendStreamingMessageRequest, SendStreamingMessageSuccessResponse,
+                        Task, TaskQueryParams)
 
 import logging
 
+from utils.llm_limiter import llm_priority
+from utils.telemetry import inject_trace_context, traced
+
+from .client_pool import client_pool
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+HAZARD_PROMPT = "Analyze this for hazards"
+COMBINED_HAZARD_PROMPT = "Analyze this for hazards in these categories: {categories}"
+
+
+def file_message_params(message_id: str, mime_type: str, file_uri: str, prompt: str) -> a2a.types.MessageSendParams:
+    # The media travels by reference; the agent loads the bytes itself
+    payload = {
+        "message": {
+            "role": "user",
+            "parts": [
+                {
+                    "kind": "text",
+                    "text": prompt
+                },
+                {
+                    "kind": "file",
+                    "file": {
+                        "uri": file_uri,
+                        "mime_type": mime_type
+                    }
+                }
+            ],
+            "message_id": message_id
+        },
+        # Lets the specialized agent continue the caller's trace and queue its model call at the caller's priority
+        "metadata": inject_trace_context() | {"priority": int(llm_priority.get())}
+    }
+    return a2a.types.MessageSendParams.model_validate(payload)
+
+
+def _event_parts(event: dict) -> list[dict]:
+    parts = list(event.get('parts', []))
+    parts += event.get('artifact', {}).get('parts', [])
+    parts += event.get('status', {}).get('message', {}).get('parts', [])
+    for artifact in event.get('artifacts', []):
+        parts += artifact.get('parts', [])
+    return parts
+
+
+def event_text(event: dict) -> str:
+    """Collects the text parts of a task, message, status or artifact event"""
+    return "".join(part.get('text', '') for part in _event_parts(event))
+
+
+def event_data(event: dict) -> list[dict]:
+    """Collects the data parts (structured reports) of a task, message, status or artifact event"""
+    return [part['data'] for part in _event_parts(event) if part.get('kind') == 'data']
+
+
 class A2aClient:
 
-    def __init__(self, agent_url: str):
+    def __init__(self, agent_url: str, httpx_client: httpx.AsyncClient = None, agent_card: AgentCard = None):
         self.agent_url = agent_url
         self.client: A2AClient = None
-        self.httpx_client: httpx.AsyncClient = None
+        self.httpx_client: httpx.AsyncClient = httpx_client
+        self.agent_card: AgentCard = agent_card
+        # Clients handed in from the pool are shared and must not be closed here
+        self._owns_httpx_client = httpx_client is None
 
     async def initialize(self):
         try:
             logger.info(f"Initializing A2A client for: {self.agent_url}")
 
             # Create async HTTP client
-            self.httpx_client = httpx.AsyncClient(timeout=30.0)
+            if self.httpx_client is None:
+                self.httpx_client = httpx.AsyncClient(timeout=30.0)
 
             # Get agent card
-            card_resolver = A2ACardResolver(
-                httpx_client=self.httpx_client,
-                base_url=self.agent_url
-            )
-            card = await card_resolver.get_agent_card()
-            logger.info(f"Successfully retrieved agent card: {card.name}")
+            card = self.agent_card
+            if card is None:
+                card_resolver = A2ACardResolver(
+                    httpx_client=self.httpx_client,
+                    base_url=self.agent_url
+                )
+                card = await card_resolver.get_agent_card()
+                logger.info(f"Successfully retrieved agent card: {card.name}")
 
             # Create A2A client
             self.client = A2AClient(
@@ -47,34 +109,24 @@ class A2aClient:
             logger.error(f"Failed to initialize A2A client: {type(e).__name__}: {str(e)}")
             raise
 
-    async def send_file(self, mime_type:str, content: bytes, prompt: str = "Analyze this and revert-back with hazards in json format"):
+    async def send_file(self, mime_type:str, file_uri: str, prompt: str = "Analyze this and revert-back with hazards in json format"):
         try:
 
             logger.info(f"Prompt: {prompt}")
 
             # Create message ID
             message_id = str(uuid.uuid4())
-            payload = {
-                "message": {
-                    "role": "user",
-                    "parts": [
-                        {
-                            "type": "blob",
-                            "text": f"{prompt}\n\nFile: {content}\nMIME Type: {mime_type}"
-                        }
-                    ],
-                    "message_id": message_id
-                }
-            }
-
             message_request = SendMessageRequest(
                 id=message_id,
-                params=a2a.types.MessageSendParams.model_validate(payload)
+                params=file_message_params(message_id, mime_type, file_uri, prompt)
             )
 
             logger.info("Sending message to agent...")
-            send_response: SendMessageResponse = await self.client.send_message(message_request)
+            with traced('a2a.send_message', 'a2a_call_duration_seconds', agent_url=self.agent_url):
+                send_response: SendMessageResponse = await self.client.send_message(message_request)
 
+            # SendMessageResponse is a RootModel over the success and error responses
+            send_response = send_response.root
             logger.info(f"Response type: {type(send_response)}")
             logger.info(f"Response: {send_response}")
 
@@ -84,7 +136,7 @@ class A2aClient:
                 logger.warning(f"Response content: {send_response}")
                 # Try to extract any useful information from the response
                 if hasattr(send_response, 'model_dump'):
-                    response_dict = send_response.model_dump(exclude_none=True)
+                    response_dict = send_response.model_dump(mode='json', exclude_none=True)
                     logger.info(f"Response as dict: {response_dict}")
                     return response_dict
                 return None
@@ -94,13 +146,12 @@ class A2aClient:
                 logger.warning(f"Result content: {send_response.result}")
                 # Still try to return the response
                 if hasattr(send_response, 'model_dump'):
-                    response_dict = send_response.model_dump(exclude_none=True)
+                    response_dict = send_response.model_dump(mode='json', exclude_none=True)
                     return response_dict
                 return None
 
-            # Convert response to JSON
-            response_content = send_response.model_dump_json(exclude_none=True)
-            json_content = json.loads(response_content)
+            # Dump straight to JSON-compatible types instead of round-tripping through a JSON string
+            json_content = send_response.model_dump(mode='json', exclude_none=True)
 
             logger.info("Response received successfully")
             return json_content
@@ -109,37 +160,43 @@ class A2aClient:
             logger.error(f"Error executing agent: {type(e).__name__}: {str(e)}")
             raise
 
+    async def stream_file(self, mime_type: str, file_uri: str, prompt: str = HAZARD_PROMPT) -> AsyncIterator[dict]:
+        """Sends the file over message/stream and yields each task, status or artifact event as it arrives"""
+        message_id = str(uuid.uuid4())
+        message_request = SendStreamingMessageRequest(
+            id=message_id,
+            params=file_message_params(message_id, mime_type, file_uri, prompt)
+        )
+
+        logger.info("Streaming message to agent...")
+        with traced('a2a.send_message_streaming', 'a2a_stream_duration_seconds', agent_url=self.agent_url):
+            async for stream_response in self.client.send_message_streaming(message_request):
+                if not isinstance(stream_response.root, SendStreamingMessageSuccessResponse):
+                    logger.warning(f"Streaming error response: {stream_response.root}")
+                    yield {"kind": "error", "error": stream_response.root.error.model_dump(mode='json', exclude_none=True)}
+                    return
+                yield stream_response.root.result.model_dump(mode='json', exclude_none=True)
+
+    async def get_task(self, task_id: str) -> dict:
+        """Fetches a task in the same response shape as send_file"""
+        get_response: GetTaskResponse = await self.client.get_task(
+            GetTaskRequest(id=str(uuid.uuid4()), params=TaskQueryParams(id=task_id))
+        )
+        return get_response.model_dump(mode='json', exclude_none=True)
+
     async def close(self):
         """Close the HTTP client"""
-        if self.httpx_client:
+        if self.httpx_client and self._owns_httpx_client:
             await self.httpx_client.aclose()
             logger.info("HTTP client closed")
 
 
-async def delegate_to_agent(content: bytes, agent_url:str, mime_type:str):
-    """Main function to demonstrate A2A client usage"""
-    prompt = sys.argv[2] if len(sys.argv) > 2 else "Analyze this for hazards"
-
-    # Create and initialize client
-    client = A2aClient(agent_url=agent_url)
-
-    try:
-        # Initialize the client
+@asynccontextmanager
+async def pooled_client(agent_url: str) -> AsyncIterator[A2aClient]:
+    """Yields an initialized client backed by the process-wide connection pool and card cache"""
+    async with client_pool.lease(agent_url) as httpx_client:
+        card = await client_pool.get_agent_card(agent_url, httpx_client)
+        client = A2aClient(agent_url=agent_url, httpx_client=httpx_client, agent_card=card)
         await client.initialize()
+        yield client
 
-        # Send file and get response
-        response = await client.send_file(mime_type, content, prompt)
-
-        # Display response
-        print("\n" + "="*80)
-        print("RESPONSE FROM  HAZARD AGENT")
-        print("="*80)
-        print(json.dumps(response, indent=2))
-        print("="*80 + "\n")
-
-    except Exception as e:
-        logger.error(f"Error in main: {type(e).__name__}: {str(e)}")
-        sys.exit(1)
-    finally:
-        # Clean up
-        await client.close()
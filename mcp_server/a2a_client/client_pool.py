@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import httpx
+from a2a.types import AgentCard
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CachedCard:
+    card: AgentCard
+    etag: Optional[str]
+    expires_at: float
+
+
+@dataclass
+class _PooledHttpClient:
+    httpx_client: httpx.AsyncClient
+    last_used: float
+    in_flight: int = 0
+
+
+class A2aClientPool:
+    """Process-wide pool of long-lived HTTP clients and resolved agent cards, keyed by agent URL."""
+
+    def __init__(self,
+                 card_ttl: float = float(os.getenv('A2A_CARD_TTL_SECONDS', '300')),
+                 idle_timeout: float = float(os.getenv('A2A_CLIENT_IDLE_SECONDS', '120')),
+                 http2: bool = os.getenv('A2A_HTTP2', 'true').lower() == 'true',
+                 request_timeout: float = float(os.getenv('A2A_REQUEST_TIMEOUT_SECONDS', '30')),
+                 max_connections: int = int(os.getenv('A2A_MAX_CONNECTIONS', '20'))):
+        self.card_ttl = card_ttl
+        self.idle_timeout = idle_timeout
+        self.http2 = http2
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self._clients: dict[str, _PooledHttpClient] = {}
+        self._cards: dict[str, _CachedCard] = {}
+        self._card_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._reaper: Optional[asyncio.Task] = None
+
+    def _new_httpx_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.request_timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.idle_timeout,
+            ),
+        )
+
+    def _ensure_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_idle_clients())
+
+    @asynccontextmanager
+    async def lease(self, agent_url: str) -> AsyncIterator[httpx.AsyncClient]:
+        """Yields the shared HTTP client for an agent URL, creating it on first use."""
+        self._ensure_reaper()
+        pooled = self._clients.get(agent_url)
+        if pooled is None or pooled.httpx_client.is_closed:
+            logger.info(f"Creating pooled HTTP client for: {agent_url}")
+            pooled = _PooledHttpClient(httpx_client=self._new_httpx_client(), last_used=time.monotonic())
+            self._clients[agent_url] = pooled
+
+        pooled.in_flight += 1
+        try:
+            yield pooled.httpx_client
+        finally:
+            pooled.in_flight -= 1
+            pooled.last_used = time.monotonic()
+
+    def in_flight(self, agent_url: str) -> int:
+        """Calls currently using the agent URL's client, for load balancing across replicas."""
+        pooled = self._clients.get(agent_url)
+        return pooled.in_flight if pooled else 0
+
+    async def get_agent_card(self, agent_url: str, httpx_client: httpx.AsyncClient) -> AgentCard:
+        """Returns the cached agent card, revalidating it with the stored ETag once the TTL expires."""
+        cached = self._cards.get(agent_url)
+        if cached and cached.expires_at > time.monotonic():
+            return cached.card
+
+        async with self._card_locks[agent_url]:
+            # Another caller may have refreshed the card while we waited for the lock
+            cached = self._cards.get(agent_url)
+            if cached and cached.expires_at > time.monotonic():
+                return cached.card
+
+            headers = {'If-None-Match': cached.etag} if cached and cached.etag else {}
+            card_url = f"{agent_url.rstrip('/')}/{AGENT_CARD_WELL_KNOWN_PATH.lstrip('/')}"
+            response = await httpx_client.get(card_url, headers=headers)
+
+            if response.status_code == 304 and cached:
+                logger.info(f"Agent card not modified for: {agent_url}")
+                cached.expires_at = time.monotonic() + self.card_ttl
+                return cached.card
+
+            response.raise_for_status()
+            card = AgentCard.model_validate(response.json())
+            self._cards[agent_url] = _CachedCard(
+                card=card,
+                etag=response.headers.get('etag'),
+                expires_at=time.monotonic() + self.card_ttl,
+            )
+            logger.info(f"Resolved agent card: {card.name}")
+            return card
+
+    def invalidate(self, agent_url: str):
+        """Drops the cached agent card so the next call fetches it again."""
+        self._cards.pop(agent_url, None)
+
+    async def _reap_idle_clients(self):
+        interval = max(self.idle_timeout / 2, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for agent_url, pooled in list(self._clients.items()):
+                if pooled.in_flight == 0 and now - pooled.last_used > self.idle_timeout:
+                    self._clients.pop(agent_url, None)
+                    await pooled.httpx_client.aclose()
+                    logger.info(f"Closed idle HTTP client for: {agent_url}")
+
+    async def close(self):
+        """Closes every pooled HTTP client and stops the idle reaper."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        clients, self._clients = self._clients, {}
+        for pooled in clients.values():
+            await pooled.httpx_client.aclose()
+        logger.info(f"Closed {len(clients)} pooled HTTP clients")
+
+
+client_pool = A2aClientPool()
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from utils.telemetry import metrics
+
+from .a2a_client import HAZARD_PROMPT, pooled_client
+from .client_pool import client_pool
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Every replica of the agent has an open circuit; the call fails fast instead of waiting on a dead agent."""
+
+
+class AgentCallError(Exception):
+    """The agent answered, but with a JSON-RPC error or a failed task."""
+
+
+@dataclass
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; after reset_timeout one probe call may close it again."""
+    failure_threshold: int
+    reset_timeout: float
+    failures: int = 0
+    opened_at: Optional[float] = None
+    probing: bool = False
+    latency: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        return state == 'closed' or (state == 'half_open' and not self.probing)
+
+    def on_start(self):
+        if self.state == 'half_open':
+            self.probing = True
+
+    def on_success(self, latency: float):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        # Smoothed latency, used to prefer the faster of otherwise equal replicas
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+    def on_failure(self) -> bool:
+        """Records a failure; True when it opened the circuit."""
+        self.failures += 1
+        opens = self.probing or (self.opened_at is None and self.failures >= self.failure_threshold)
+        if opens:
+            self.opened_at = time.monotonic()
+        self.probing = False
+        return opens
+
+
+def _check_response(response: Optional[dict]) -> dict:
+    if not response:
+        raise AgentCallError("Agent returned no response")
+    if 'error' in response:
+        raise AgentCallError(f"Agent error: {response['error']}")
+    state = response.get('result', {}).get('status', {}).get('state')
+    if state in ('failed', 'rejected'):
+        raise AgentCallError(f"Agent task {state}")
+    return response
+
+
+class ResilientA2aCaller:
+    """Calls an agent over A2A with retries, hedging and a circuit breaker per agent URL.
+
+    An agent may have several replicas, given as the registry's weighted endpoints ({'uri', 'weight', 'load'}).
+    Replicas with an open circuit are skipped. Of the rest, 'least_loaded' balancing takes the lowest
+    (calls in flight here + reported load + 1) / weight; 'p2c' draws two replicas by weight and takes the
+    less loaded, which spreads callers that share stale load figures. Failed attempts are retried on another
+    replica when there is one, after a jittered exponential backoff. With a hedge delay, a call still running
+    after that long is duplicated on a second replica (or the same agent when it has one) and the first
+    answer wins.
+    """
+
+    def __init__(self,
+                 max_attempts: int = int(os.getenv('A2A_MAX_ATTEMPTS', '3')),
+                 base_backoff: float = float(os.getenv('A2A_BACKOFF_BASE_SECONDS', '0.5')),
+                 max_backoff: float = float(os.getenv('A2A_BACKOFF_MAX_SECONDS', '5')),
+                 hedge_delay: float = float(os.getenv('A2A_HEDGE_DELAY_SECONDS', '0')),
+                 failure_threshold: int = int(os.getenv('A2A_BREAKER_FAILURES', '5')),
+                 reset_timeout: float = float(os.getenv('A2A_BREAKER_RESET_SECONDS', '30')),
+                 balancing: str = os.getenv('A2A_BALANCING', 'p2c')):
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge_delay = hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.balancing = balancing
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, agent_url: str) -> CircuitBreaker:
+        if agent_url not in self.breakers:
+            self.breakers[agent_url] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[agent_url]
+
+    @staticmethod
+    def _score(replica: dict) -> float:
+        return (client_pool.in_flight(replica['uri']) + replica.get('load', 0) + 1) / (replica.get('weight') or 1.0)
+
+    def pick(self, replicas: list[dict], exclude: tuple[str, ...] = ()) -> str:
+        """A replica URL, preferring ones not in exclude; raises CircuitOpenError when every circuit is open."""
+        allowed = [replica for replica in replicas if self.breaker(replica['uri']).allow()]
+        if not allowed:
+            metrics.increment('a2a_circuit_rejections_total', agent_url=replicas[0]['uri'])
+            raise CircuitOpenError(f"Circuit open for {', '.join(replica['uri'] for replica in replicas)}")
+        candidates = [replica for replica in allowed if replica['uri'] not in exclude] or allowed
+        if self.balancing == 'p2c' and len(candidates) > 2:
+            first = random.choices(candidates, weights=[r.get('weight') or 1.0 for r in candidates])[0]
+            rest = [replica for replica in candidates if replica is not first]
+            candidates = [first, random.choices(rest, weights=[r.get('weight') or 1.0 for r in rest])[0]]
+        best = min(candidates, key=lambda replica: (self._score(replica), self.breaker(replica['uri']).latency or 0.0))
+        return best['uri']
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from many callers from arriving together
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def _record_failure(self, agent_url: str, error: BaseException):
+        metrics.increment('a2a_call_failures_total', agent_url=agent_url)
+        if self.breaker(agent_url).on_failure():
+            logger.warning(f"Circuit opened for {agent_url} after {type(error).__name__}: {error}")
+
+    async def _call_once(self, agent_url: str, mime_type: str, file_uri: str, prompt: str) -> dict:
+        breaker = self.breaker(agent_url)
+        breaker.on_start()
+        start = time.monotonic()
+        try:
+            async with pooled_client(agent_url) as client:
+                response = _check_response(await client.send_file(mime_type, file_uri, prompt))
+        except asyncio.CancelledError:
+            # A losing hedge or the caller's timeout: says nothing about the agent's health
+            breaker.probing = False
+            raise
+        except Exception as e:
+            self._record_failure(agent_url, e)
+            raise
+        breaker.on_success(time.monotonic() - start)
+        return response
+
+    async def _hedged_call(self, replicas: list[dict], tried: list[str],
+                           mime_type: str, file_uri: str, prompt: str) -> dict:
+        primary = self.pick(replicas, tuple(tried))
+        tried.append(primary)
+        calls = [asyncio.create_task(self._call_once(primary, mime_type, file_uri, prompt))]
+        try:
+            if self.hedge_delay > 0:
+                done, _ = await asyncio.wait(calls, timeout=self.hedge_delay)
+                if not done:
+                    try:
+                        hedge = self.pick(replicas, tuple(tried))
+                    except CircuitOpenError:
+                        hedge = None
+                    if hedge is not None:
+                        logger.info(f"Hedging slow call to {primary} on {hedge}")
+                        metrics.increment('a2a_hedged_calls_total', agent_url=hedge)
+                        tried.append(hedge)
+                        calls.append(asyncio.create_task(self._call_once(hedge, mime_type, file_uri, prompt)))
+
+            error: Optional[BaseException] = None
+            pending = set(calls)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if call.exception() is None:
+                        return call.result()
+                    error = call.exception()
+            raise error
+        finally:
+            for call in calls:
+                call.cancel()
+            await asyncio.gather(*calls, return_exceptions=True)
+
+    async def send_file(self, replicas: list[dict], mime_type: str, file_uri: str,
+                        prompt: str = HAZARD_PROMPT) -> dict:
+        """A2aClient.send_file with retries, hedging and circuit breaking across the agent's replicas."""
+        tried: list[str] = []
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._hedged_call(replicas, tried, mime_type, file_uri, prompt)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                delay = self._backoff(attempt)
+                metrics.increment('a2a_retries_total', agent_url=tried[-1])
+                logger.warning(f"Call to {tried[-1]} failed ({type(e).__name__}: {e}), "
+                               f"retrying in {delay:.2f}s (attempt {attempt + 1} of {self.max_attempts})")
+                await asyncio.sleep(delay)
+
+    async def stream_file(self, replicas: list[dict], mime_type: str, file_uri: str,
+                          prompt: str = HAZARD_PROMPT) -> AsyncIterator[tuple[str, dict]]:
+        """Yields (agent_url, event) from the healthiest replica.
+
+        A stream is only retried while it has produced no events: after that the caller has seen partial output.
+        """
+        tried: list[str] = []
+        for attempt in range(self.max_attempts):
+            agent_url = self.pick(replicas, tuple(tried))
+            tried.append(agent_url)
+            breaker = self.breaker(agent_url)
+            breaker.on_start()
+            start = time.monotonic()
+            received = False
+            try:
+                async with pooled_client(agent_url) as client:
+                    async for event in client.stream_file(mime_type, file_uri, prompt):
+                        if event.get('kind') == 'error':
+                            raise AgentCallError(f"Agent error: {event.get('error')}")
+                        received = True
+                        yield agent_url, event
+            except (asyncio.CancelledError, GeneratorExit):
+                breaker.probing = False
+                raise
+            except Exception as e:
+                self._record_failure(agent_url, e)
+                if received or attempt == self.max_attempts - 1:
+                    raise
+                delay = self._backoff(attempt)
+                metrics.increment('a2a_retries_total', agent_url=agent_url)
+                logger.warning(f"Stream from {agent_url} failed ({type(e).__name__}: {e}), "
+                               f"retrying in {delay:.2f}s (attempt {attempt + 1} of {self.max_attempts})")
+                await asyncio.sleep(delay)
+            else:
+                breaker.on_success(time.monotonic() - start)
+                return
+
+
+# One set of circuit breakers per process, shared by every caller of an agent URL
+a2a_caller = ResilientA2aCaller()
+
+
+async def delegate_to_agent(file_uri: str, agent_url: str, mime_type: str, prompt: str = HAZARD_PROMPT,
+                            replicas: Optional[list[dict]] = None) -> dict:
+    """Sends the file to the agent through the resilient caller; errors propagate to the MCP tool as a tool error.
+
+    Given the agent's replicas, the replica is picked here, where the circuit breakers see every call's outcome.
+    """
+    response = await a2a_caller.send_file(replicas or [{'uri': agent_url}], mime_type, file_uri, prompt)
+    logger.info(f"Response from hazard agent {agent_url}: {json.dumps(response)}")
+    return response
@@ -1,123 +1,447 @@
+import asyncio
 import logging
 import os
-from typing import Any, Coroutine
+from typing import Any, AsyncIterator, Coroutine, Optional
 import json
 
 import a2a.types
 import dotenv
-from google.adk.tools import BaseTool
 
 dotenv.load_dotenv()
-from google.adk.models.lite_llm import LiteLlm
 
 from utils.callbacks import (
     logger_before_agent_callback,
     logger_after_agent_callback,
+    logger_before_tool_callback,
+    logger_after_tool_callback,
+    logger_on_tool_error_callback,
+    logger_before_model_callback,
+    logger_after_model_callback,
     logger_on_model_error_callback
 )
+from utils.llm_limiter import RateLimitedLiteLlm, llm_priority
 
 from a2a.types import AgentCard
 
+from mcp_server.a2a_client.a2a_client import (COMBINED_HAZARD_PROMPT, HAZARD_PROMPT, event_data, event_text,
+                                              pooled_client)
+from mcp_server.a2a_client.client_pool import client_pool
+from mcp_server.a2a_client.resilience import a2a_caller
+from mcp_server.registry import AgentRegistry
+from root_agent.workflow import HazardWorkflowAgent
+from utils.hazard_schema import HazardReport, MultiHazardReport, merge_segment_reports
+from utils.mcp_session import McpSession, tool_text
+from utils.media_store import media_store
+from utils.result_cache import result_cache
+from utils.telemetry import inject_trace_context, traced
+from utils.video_segmenter import SEGMENT_SET_MIME_TYPE, load_segment_set
+
 from google.adk.agents import Agent
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset,SseConnectionParams,McpToolsetConfig
 import dotenv
 
 dotenv.load_dotenv()
 
+def _json_object(text: str) -> dict:
+    """Parses the JSON object in a model reply, ignoring any markdown fence or prose around it."""
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError("Model reply contains no JSON object")
+    return json.loads(text[start:end + 1])
+
+
+class RegistryUnavailableError(Exception):
+    """The agent registry could not be listed; analysing against no agents would look like a clean result."""
+
+
 class HostAgent:
 
+    # Fan-out limits for execute_all_agents
+    max_concurrency = int(os.getenv('AGENT_MAX_CONCURRENCY', '6'))
+    agent_timeout = float(os.getenv('AGENT_TIMEOUT_SECONDS', '120'))
+    analysis_deadline = float(os.getenv('ANALYSIS_DEADLINE_SECONDS', '300'))
+    # 'workflow' dispatches programmatically and calls the LLM only to consolidate; 'llm' lets the model plan
+    orchestration_mode = os.getenv('ORCHESTRATION_MODE', 'workflow')
+    # 'direct' reads the registry and calls agents over A2A in-process; 'mcp' routes both through the MCP server
+    a2a_transport = os.getenv('A2A_TRANSPORT', 'direct')
+    # 'per_agent' calls every hazard agent; 'combined' asks the multi-hazard agent once for all their categories
+    analysis_mode = os.getenv('ANALYSIS_MODE', 'per_agent')
+    combined_agent_name = 'multi_hazard_agent'
+    combined_agent_url = os.getenv('COMBINED_AGENT_URL', 'http://127.0.0.1:8000/a2a/multi_hazard_agent')
+    # Segments of a long video analysed at once, each fanning out to every agent
+    segment_workers = int(os.getenv('SEGMENT_WORKERS', '4'))
+
     def __init__(self,):
-        self.tools = []
         self.agents = []
+        # Both connect lazily: the registry pool on first direct read, the MCP session in start()
+        self.registry = AgentRegistry()
+        self.mcp_session = McpSession()
 
-    async def get_tools_async(self) -> list[BaseTool]:
-            try:
-                sse_params = SseConnectionParams(
-                    url="http://localhost:8181/sse",  # URL of the MCP server supporting SSE
-                    timeout=30  # Connection timeout in seconds
-                )
-
-                # Define the MCP configuration including the SSE connection parameters
-                mcp_config = McpToolsetConfig(
-                    sse_connection_params=sse_params
-                )
-
-                # Create the MCPToolset from the configuration
-                return await McpToolset.from_config(config=mcp_config, config_abs_path="").get_tools()
+    async def start(self):
+        if self.a2a_transport == 'mcp':
+            await self.mcp_session.start()
 
+    async def close(self):
+        await self.mcp_session.close()
+        await self.registry.close()
+        await client_pool.close()
 
+    async def get_agents(self) -> list[dict]:
+        if self.a2a_transport == 'direct':
+            try:
+                with traced('registry.list_agents', 'registry_query_duration_seconds'):
+                    self.agents = await self.registry.list_agents()
+                return self.agents
             except Exception as e:
-                logging.error(f"Error in mcp_tool_set initialization: {type(e).__name__}: {str(e)}", exc_info=True)
-                raise
+                logging.error(f"Error listing registered agents: {type(e).__name__}: {e}")
+                raise RegistryUnavailableError(f"{type(e).__name__}: {e}") from e
 
-    async def get_agents(self) -> list[dict]:
-        if len(self.tools) == 0:
-            self.tools = await self.get_tools_async()
-        tool = [tool for tool in self.tools if tool.name == 'list_registered_agents'][0]
         try:
-            agents = await tool.run_async(args={}, tool_context=None)
-            agents = json.loads(agents['content'][0]['text'])
+            with traced('mcp.list_registered_agents', 'mcp_call_duration_seconds', agent='registry'):
+                result = await self.mcp_session.call_tool('list_registered_agents')
+            agents = json.loads(tool_text(result))
+            self.agents = agents
             return agents
         except Exception as e:
-            ...
+            logging.error(f"Error listing registered agents: {type(e).__name__}: {e}")
+            raise RegistryUnavailableError(f"{type(e).__name__}: {e}") from e
+
+
+    def _result_cache_key(self, file_uri: str, agent_name: str, agent_uri: str) -> str:
+        agent_version = next((agent.get('version') for agent in self.agents if agent.get('name') == agent_name), None)
+        return result_cache.make_key(self._content_key(file_uri), agent_name, agent_version or agent_uri,
+                                     os.getenv('LLM_MODEL'))
 
+    def _replicas(self, agent_name: str, agent_uri: str) -> list[dict]:
+        """The agent's healthy replicas as weighted endpoints from the registry, or just its URI when none are listed."""
+        agent = next((agent for agent in self.agents if agent.get('name') == agent_name), {})
+        return agent.get('replicas') or [{'uri': agent_uri}]
 
-    async def execute_agent(self,content: bytes, agent_name:str, agent_uri:str, mime_type:str):
+    @staticmethod
+    def _content_key(file_uri: str) -> str:
+        try:
+            return media_store.content_key_for_uri(file_uri)
+        except ValueError:
+            return file_uri
+
+    async def execute_agent(self, file_uri: str, agent_name:str, agent_uri:str, mime_type:str):
         logging.info(f"Executing agent {agent_name} {agent_uri} {mime_type}")
-        
-        # Ensure tools are loaded
-        if not self.tools:
-            self.tools = await self.get_tools_async()
-            
-        tools_list = [tool for tool in self.tools if tool.name == 'agent_executor']
-        
-        if not tools_list:
-            # Refresh tools and try again
-            logging.info("Tool 'agent_executor' not found, refreshing tools list...")
-            self.tools = await self.get_tools_async()
-            tools_list = [tool for tool in self.tools if tool.name == 'agent_executor']
-            
-        if not tools_list:
-            available_tools = [t.name for t in self.tools]
-            error_msg = f"Tool 'agent_executor' not found. Available tools: {available_tools}"
-            logging.error(error_msg)
-            return {"error": error_msg}
-            
-        tool = tools_list[0]
+
+        # Identical media analysed by the same agent definition and model returns the stored result
+        cache_key = self._result_cache_key(file_uri, agent_name, agent_uri)
+        cached_result = await result_cache.get(cache_key)
+        if cached_result is not None:
+            logging.info(f"Result cache hit for agent {agent_name}")
+            return cached_result
+
+        if self.a2a_transport == 'direct':
+            result = await self._execute_agent_direct(file_uri, agent_name, agent_uri, mime_type)
+        else:
+            result = await self._execute_agent_mcp(file_uri, agent_name, agent_uri, mime_type)
+        if isinstance(result, dict) and 'error' not in result:
+            # Only the compact report is kept; the task's history and metadata are not needed downstream
+            result = self._hazard_report(agent_name, result.get('result', {}))
+            if 'error' not in result:
+                await result_cache.put(cache_key, result)
+        return result
+
+    @staticmethod
+    def _hazard_report(agent_name: str, task: dict) -> dict:
+        """The task's HazardReport DataPart, or for agents that answer in text, the report parsed from it."""
+        data = event_data(task)
+        text = event_text(task)
+        try:
+            report = HazardReport.model_validate(data[0] if data else _json_object(text))
+        except ValueError:
+            if not text:
+                return {"error": "Agent returned no hazard report"}
+            # Unstructured answers still reach the consolidator, as the summary
+            report = HazardReport(agent=agent_name, summary=text)
+        report.agent = agent_name
+        return report.model_dump(mode='json', exclude_none=True)
+
+    async def _execute_agent_direct(self, file_uri: str, agent_name: str, agent_uri: str, mime_type: str):
+        """Sends the file reference straight to the agent, with retries, hedging and circuit breaking."""
         try:
-            result = await tool.run_async(args={'content':content,'agent_url':agent_uri,'mime_type':mime_type}, tool_context=None)
-            if 'content' in result and len(result['content']) > 0:
-                parsed_result = json.loads(result['content'][0]['text'])
-                return parsed_result
+            return await a2a_caller.send_file(self._replicas(agent_name, agent_uri), mime_type, file_uri,
+                                              HAZARD_PROMPT)
         except Exception as e:
-            logging.error(f"Error executing agent {agent_name}: {e}")
+            logging.error(f"Error executing agent {agent_name}: {type(e).__name__}: {e}")
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    async def _execute_agent_mcp(self, file_uri: str, agent_name: str, agent_uri: str, mime_type: str):
+        """Delegates through the MCP server's agent_executor tool."""
+        try:
+            with traced('mcp.agent_executor', 'mcp_call_duration_seconds', agent=agent_name):
+                # The MCP server picks the replica: its circuit breakers are the ones that see the calls
+                result = await self.mcp_session.call_tool('agent_executor', {
+                    'file_uri': file_uri, 'agent_url': agent_uri, 'mime_type': mime_type,
+                    'replicas': self._replicas(agent_name, agent_uri),
+                    'trace_context': inject_trace_context(), 'priority': int(llm_priority.get())})
+            if result.isError:
+                return {"error": tool_text(result)}
+            if result.content:
+                return json.loads(tool_text(result))
+            return {"error": "Agent returned no result"}
+        except Exception as e:
+            logging.error(f"Error executing agent {agent_name}: {type(e).__name__}: {e}")
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    async def execute_all_agents(self, file_uri: str, mime_type: str) -> dict:
+        """Executes every registered specialized agent concurrently and returns their results keyed by agent name."""
+        agents = await self.get_agents()
+        if mime_type == SEGMENT_SET_MIME_TYPE:
+            return await self.execute_segments(file_uri, agents)
+        return await self._execute_agents(file_uri, mime_type, agents)
+
+    async def iter_segments(self, segment_set: dict, agents: list[dict]) -> AsyncIterator[tuple[dict, dict]]:
+        """Analyses the segments of a segment set concurrently and yields (segment, results by agent) as each finishes."""
+        semaphore = asyncio.Semaphore(self.segment_workers)
+
+        async def run_segment(segment: dict) -> tuple[dict, dict]:
+            async with semaphore:
+                with traced('segment.execute', 'segment_duration_seconds'):
+                    return segment, await self._execute_agents(segment['uri'], segment['mime_type'], agents)
+
+        tasks = [asyncio.create_task(run_segment(segment)) for segment in segment_set['segments']]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def execute_segments(self, file_uri: str, agents: list[dict]) -> dict:
+        """Map-reduce over a long video: every segment goes to every agent, then each agent's findings are merged
+        into one report with overlapping detections deduplicated by time and category."""
+        segment_set = await asyncio.to_thread(load_segment_set, file_uri)
+        by_agent: dict[str, list[tuple[dict, dict]]] = {}
+        async for segment, results in self.iter_segments(segment_set, agents):
+            for agent_name, result in results.items():
+                by_agent.setdefault(agent_name, []).append((segment, result))
+
+        results = {name: merge_segment_reports(name, reports, segment_set['overlap_seconds'])
+                   for name, reports in by_agent.items()}
+        failed = [name for name, result in results.items() if 'error' in result]
+        logging.info(f"Merged {len(segment_set['segments'])} segments from {len(results)} agents, "
+                     f"{len(failed)} failed: {failed}")
+        return results
+
+    async def _execute_agents(self, file_uri: str, mime_type: str, agents: list[dict]) -> dict:
+        if self.analysis_mode == 'combined':
+            return await self.execute_combined(file_uri, mime_type, agents)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_agent(agent: dict):
+            async with semaphore:
+                with traced('agent.execute', 'agent_duration_seconds', agent=agent['name']):
+                    return await asyncio.wait_for(
+                        self.execute_agent(file_uri, agent['name'], agent['uri'], mime_type),
+                        timeout=self.agent_timeout
+                    )
+
+        tasks = {agent['name']: asyncio.create_task(run_agent(agent)) for agent in agents}
+        if not tasks:
+            return {}
+
+        _, pending = await asyncio.wait(tasks.values(), timeout=self.analysis_deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        results = {}
+        for agent_name, task in tasks.items():
+            if task in pending:
+                results[agent_name] = {"error": f"Analysis deadline of {self.analysis_deadline}s exceeded"}
+            elif isinstance(task.exception(), asyncio.TimeoutError):
+                results[agent_name] = {"error": f"Agent timed out after {self.agent_timeout}s"}
+            elif task.exception() is not None:
+                results[agent_name] = {"error": f"{type(task.exception()).__name__}: {task.exception()}"}
+            elif task.result() is None:
+                results[agent_name] = {"error": "Agent returned no result"}
+            else:
+                results[agent_name] = task.result()
+
+        failed = [name for name, result in results.items() if isinstance(result, dict) and 'error' in result]
+        logging.info(f"Executed {len(results)} agents, {len(failed)} failed: {failed}")
+        return results
+
+    async def execute_combined(self, file_uri: str, mime_type: str, agents: list[dict]) -> dict:
+        """Analyses the media for every agent's category in one multi-hazard call and splits the result by agent."""
+        names = sorted(agent['name'] for agent in agents)
+        if not names:
+            return {}
+
+        versions = ",".join(f"{agent['name']}={agent.get('version')}" for agent in sorted(agents, key=lambda a: a['name']))
+        cache_key = result_cache.make_key(self._content_key(file_uri), self.combined_agent_name, versions,
+                                          os.getenv('LLM_MODEL'))
+        findings = await result_cache.get(cache_key)
+        if findings is not None:
+            logging.info(f"Result cache hit for agent {self.combined_agent_name}")
+        else:
+            prompt = COMBINED_HAZARD_PROMPT.format(categories=", ".join(names))
+            try:
+                with traced('agent.execute', 'agent_duration_seconds', agent=self.combined_agent_name):
+                    async with asyncio.timeout(self.agent_timeout):
+                        response = await a2a_caller.send_file([{'uri': self.combined_agent_url}], mime_type, file_uri, prompt)
+                task = response.get('result', {})
+                data = event_data(task)
+                reports = MultiHazardReport.model_validate(data[0] if data else _json_object(event_text(task))).reports
+                findings = {report.agent: report.model_dump(mode='json', exclude_none=True) for report in reports}
+            except TimeoutError:
+                return {name: {"error": f"Agent timed out after {self.agent_timeout}s"} for name in names}
+            except Exception as e:
+                logging.error(f"Error executing agent {self.combined_agent_name}: {type(e).__name__}: {e}")
+                return {name: {"error": f"{type(e).__name__}: {e}"} for name in names}
+            if all(name in findings for name in names):
+                await result_cache.put(cache_key, findings)
+
+        results = {name: findings[name] if name in findings else {"error": "Category missing from the combined analysis"}
+                   for name in names}
+        failed = [name for name, result in results.items() if isinstance(result, dict) and 'error' in result]
+        logging.info(f"Combined analysis covered {len(results)} agents, {len(failed)} failed: {failed}")
+        return results
+
+    async def _stream_agent(self, file_uri: str, agent: dict, mime_type: str, findings: asyncio.Queue):
+        cache_key = self._result_cache_key(file_uri, agent['name'], agent['uri'])
+        cached_result = await result_cache.get(cache_key)
+        if cached_result is not None:
+            await findings.put({"agent": agent['name'], "kind": "cached",
+                                "text": json.dumps(cached_result), "final": True})
+            return
+
+        task_id = agent_url = None
+        async with asyncio.timeout(self.agent_timeout):
+            events = a2a_caller.stream_file(self._replicas(agent['name'], agent['uri']), mime_type, file_uri)
+            async for agent_url, event in events:
+                task_id = event.get('taskId') or (event.get('id') if event.get('kind') == 'task' else task_id)
+                data = event_data(event)
+                await findings.put({"agent": agent['name'], "kind": event.get('kind'),
+                                    "text": event_text(event) or (json.dumps(data[0]) if data else ""),
+                                    "final": event.get('final', False)})
+            # The finished task gives the agent's report, cached so a later consolidation run is served from it;
+            # tasks live on the replica that ran them
+            if not task_id:
+                report = {"error": "Agent returned no result"}
+            else:
+                async with pooled_client(agent_url) as client:
+                    result = await client.get_task(task_id)
+                if 'error' in result:
+                    report = {"error": f"Task lookup failed: {result['error']}"}
+                else:
+                    report = self._hazard_report(agent['name'], result.get('result', {}))
+                    if 'error' not in report:
+                        await result_cache.put(cache_key, report)
+        await findings.put(self._result_finding(agent['name'], report))
+
+    @staticmethod
+    def _result_finding(agent_name: str, result: dict) -> dict:
+        is_error = isinstance(result, dict) and 'error' in result
+        return {"agent": agent_name, "kind": "error" if is_error else "result",
+                "text": result['error'] if is_error else json.dumps(result), "final": True}
+
+    @staticmethod
+    def finding_report(finding: dict) -> Optional[dict]:
+        """Returns the report, or {'error': ...}, carried by an agent's closing finding; None for any other finding."""
+        if not finding['final'] or finding['agent'] is None:
+            return None
+        if finding['kind'] == 'error':
+            return {"error": finding['text']}
+        if finding['kind'] in ('result', 'cached'):
+            return json.loads(finding['text'])
+        return None
+
+    async def stream_all_agents(self, file_uri: str, mime_type: str) -> AsyncIterator[dict]:
+        """Streams every registered agent concurrently and yields each finding as soon as it arrives."""
+        agents = await self.get_agents()
+        if mime_type == SEGMENT_SET_MIME_TYPE:
+            # Segments finish in any order; each agent's report carries the time window it covers
+            segment_set = await asyncio.to_thread(load_segment_set, file_uri)
+            async for segment, results in self.iter_segments(segment_set, agents):
+                for agent_name, result in results.items():
+                    yield self._result_finding(agent_name, result) | {
+                        "segment": {"start": segment['start'], "end": segment['end']}}
+            return
+        if self.analysis_mode == 'combined':
+            # A single model call has nothing to interleave, so each category arrives when the call finishes
+            results = await self.execute_combined(file_uri, mime_type, agents)
+            for agent_name, result in results.items():
+                yield self._result_finding(agent_name, result)
+            return
+
+        findings: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_agent(agent: dict):
+            try:
+                async with semaphore:
+                    with traced('agent.stream', 'agent_duration_seconds', agent=agent['name']):
+                        await self._stream_agent(file_uri, agent, mime_type, findings)
+            except Exception as e:
+                logging.error(f"Error streaming agent {agent['name']}: {type(e).__name__}: {e}")
+                await findings.put({"agent": agent['name'], "kind": "error",
+                                    "text": f"{type(e).__name__}: {e}", "final": True})
+            finally:
+                await findings.put(None)
+
+        tasks = [asyncio.create_task(run_agent(agent)) for agent in agents]
+        remaining = len(tasks)
+        try:
+            async with asyncio.timeout(self.analysis_deadline):
+                while remaining:
+                    finding = await findings.get()
+                    if finding is None:
+                        remaining -= 1
+                        continue
+                    yield finding
+        except TimeoutError:
+            yield {"agent": None, "kind": "error",
+                   "text": f"Analysis deadline of {self.analysis_deadline}s exceeded", "final": True}
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     def root_instruction(self) -> str:
         return f"""
         You are a root orchestrator agent. Your role is to coordinate and delegate tasks to each of the agents.
         
         Available Tools:
+        - execute_all_agents: Execute all specialized agents in parallel and return their results.
         - get_agents: Retrieve list of specialized agents.
         - execute_agent: Execute a specific specialized agent.
         
         Follow this execution plan strictly:
-        1. Call the 'get_agents' tool to retrieve the list of all available specialized agents only once.
-        2. For EACH agent returned by 'get_agents':
-           - Call the 'execute_agent' tool.
-           - Pass the agent's 'name' and 'uri' from the list.
+        1. Call the 'execute_all_agents' tool EXACTLY ONCE.
            - Pass 'mime_type' as {{mime_type}}.
-           - Pass 'content' as {{file_path}}.
-           - Execute each agent EXACTLY ONCE.
+           - Pass 'file_uri' as {{file_uri}}.
+        2. Only if an agent result contains an 'error', you may call 'execute_agent' once for that agent,
+           passing the agent's 'name' and 'uri' from 'get_agents', 'mime_type' and 'file_uri' as above.
         3. Finally, return the consolidated report to the user.
         
         CRITICAL: Do NOT repeat this process. Once all agents have been executed, generate the report and STOP.
         """
 
-    llm_model = LiteLlm(
+    llm_model = RateLimitedLiteLlm(
         model=os.getenv('LLM_MODEL'),
     )
 
+    def consolidation_instruction(self) -> str:
+        return """
+        You are a hazard report consolidator. The specialized hazard agents have already analysed the media.
+        Their findings, de-duplicated, grouped by hazard category and ordered by severity, are:
+        {hazard_results}
+        
+        For a long recording they are listed under 'timeline' in time order instead, with the category on each.
+        
+        Write one consolidated hazard report for the user from these findings, keeping the category grouping,
+        or for a timeline, the order of events with their times.
+        Mention every agent under 'failed_agents' as not analysed. Do not invent hazards.
+        """
+
     async def create_agent(self):
+        if self.orchestration_mode == 'workflow':
+            return self.create_workflow_agent()
         #await self.get_agents()
         root_agent = Agent(
             model=self.llm_model,
@@ -126,17 +450,43 @@ class HostAgent:
             name="root_agent",
             before_agent_callback=[logger_before_agent_callback],
             after_agent_callback=[logger_after_agent_callback],
-            #before_tool_callback=[logger_before_tool_callback],
-            #after_tool_callback=[logger_after_tool_callback],
-            #on_tool_error_callback=[logger_on_tool_error_callback],
+            before_tool_callback=[logger_before_tool_callback],
+            after_tool_callback=[logger_after_tool_callback],
+            on_tool_error_callback=[logger_on_tool_error_callback],
+            before_model_callback=[logger_before_model_callback],
+            after_model_callback=[logger_after_model_callback],
             on_model_error_callback=[logger_on_model_error_callback],
             tools=[
+                self.execute_all_agents,
                 self.get_agents,
                 self.execute_agent,
             ]
         )
         return root_agent
 
+    def create_workflow_agent(self):
+        consolidator = Agent(
+            model=self.llm_model,
+            instruction=self.consolidation_instruction(),
+            description="Consolidates the specialized hazard agent results into one report",
+            name="consolidation_agent",
+            disallow_transfer_to_parent=True,
+            disallow_transfer_to_peers=True,
+            before_agent_callback=[logger_before_agent_callback],
+            after_agent_callback=[logger_after_agent_callback],
+            before_model_callback=[logger_before_model_callback],
+            after_model_callback=[logger_after_model_callback],
+            on_model_error_callback=[logger_on_model_error_callback],
+        )
+        return HazardWorkflowAgent(
+            name="root_agent",
+            description="Runs every specialized hazard agent and consolidates their results",
+            host_agent=self,
+            consolidator=consolidator,
+            before_agent_callback=[logger_before_agent_callback],
+            after_agent_callback=[logger_after_agent_callback],
+        )
+
     agent_skil= a2a.types.AgentSkill(
         name="Video_Risk_Hazard_Analyser_Skill",
         description="Video_Raisk_analyser_skil",
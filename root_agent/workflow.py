@@ -0,0 +1,50 @@
+import json
+import logging
+from typing import Any, AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai.types import Content, Part
+
+from utils.hazard_schema import merge_reports
+from utils.video_segmenter import SEGMENT_SET_MIME_TYPE
+
+
+class HazardWorkflowAgent(BaseAgent):
+    """Dispatches to every registered agent programmatically and uses the LLM only to consolidate the results."""
+
+    host_agent: Any
+    consolidator: LlmAgent
+
+    def __init__(self, *, name: str, host_agent: Any, consolidator: LlmAgent, **kwargs):
+        super().__init__(name=name, host_agent=host_agent, consolidator=consolidator,
+                         sub_agents=[consolidator], **kwargs)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        if 'file_uri' not in state:
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                content=Content(role="model", parts=[Part(text="No media found in the session to analyse.")]),
+            )
+            return
+
+        results = await self.host_agent.execute_all_agents(state['file_uri'], state['mime_type'])
+        logging.info(f"Workflow collected results from {len(results)} agents")
+
+        # Merged findings reach the consolidator through session state, not through extra model turns
+        merged = merge_reports(results, timeline=state['mime_type'] == SEGMENT_SET_MIME_TYPE)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=EventActions(state_delta={
+                'hazard_results': json.dumps(merged, separators=(',', ':')),
+                # Lets callers tell a report from a run where no agent answered
+                'succeeded_agents': sorted(name for name, result in results.items() if 'error' not in result),
+            }),
+        )
+
+        async for event in self.consolidator.run_async(ctx):
+            yield event
@@ -0,0 +1,134 @@
+import glob
+import json
+import os
+from dataclasses import dataclass
+
+import dotenv
+from google.adk.agents import Agent
+
+from utils.callbacks import (
+    logger_before_agent_callback,
+    logger_after_agent_callback,
+    logger_before_tool_callback,
+    logger_after_tool_callback,
+    logger_on_tool_error_callback,
+    logger_on_model_error_callback,
+    logger_before_model_callback,
+    logger_after_model_callback,
+    priority_before_model_callback,
+    resolve_file_uri_before_model_callback
+)
+from utils.hazard_schema import HazardReport, MultiHazardReport
+from utils.llm_limiter import RateLimitedLiteLlm
+
+dotenv.load_dotenv()
+
+SPECIALIZED_AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INSTRUCTION_TEMPLATE = (
+    "You are an expert in analysing video or image for {hazard} hazards."
+    "Analyse video or image for {hazard} hazards and return the response"
+    "in the user specified format only. "
+    "If user does not specify return in JSON format"
+    "When user greets respond in a friendly manner and introduce your self and ask for the task "
+    "the user want to perform. Do only the {hazard} hazards analysis task."
+    "When user asks about your self, or your capabilities or offerings please respond in a friendly manner"
+    "Do not use abusive words, do not use sentence that hurts communal sentiments, do not sue words"
+    "that has discrimination towards race, cast, religion, colour, gender etc"
+)
+
+DESCRIPTION_TEMPLATE = "You are a {hazard} Hazard Agent, who can analyse image or video for {hazard} hazards."
+
+COMBINED_AGENT_NAME = "multi_hazard_agent"
+
+# One model call covers every requested category, so the media's input tokens are paid once instead of per agent
+COMBINED_INSTRUCTION_TEMPLATE = (
+    "You are an expert in analysing video or image for environment, health and safety hazards. "
+    "The user names the hazard categories to analyse. The known categories are:\n{categories}\n"
+    "Analyse the video or image once and return one report per requested category, with 'agent' set to the "
+    "category name. Use an empty findings list for a category with no hazards and do not add categories that "
+    "were not requested. "
+    "Do not use abusive words, do not use sentence that hurts communal sentiments, do not sue words"
+    "that has discrimination towards race, cast, religion, colour, gender etc"
+)
+
+# One client for every hazard agent in the process, so they share LiteLLM's connection pool and the LLM limiter
+llm_model = RateLimitedLiteLlm(
+    model=os.getenv('LLM_MODEL'),
+)
+
+
+@dataclass
+class HazardAgentSpec:
+    name: str
+    hazard: str
+    card: dict
+    card_path: str
+
+
+def load_spec(agent_dir: str) -> HazardAgentSpec:
+    """Reads an agent.json card; the hazard defaults to the card name without the _hazard_agent suffix."""
+    card_path = os.path.join(agent_dir, 'agent.json')
+    with open(card_path) as f:
+        card = json.load(f)
+    name = card['name']
+    hazard = card.get('hazard') or name.removesuffix('_hazard_agent')
+    return HazardAgentSpec(name=name, hazard=hazard, card=card, card_path=card_path)
+
+
+def load_specs(agents_dir: str = SPECIALIZED_AGENTS_DIR) -> list[HazardAgentSpec]:
+    return [load_spec(os.path.dirname(path)) for path in sorted(glob.glob(os.path.join(agents_dir, '*', 'agent.json')))]
+
+
+def _callbacks() -> dict:
+    return dict(
+        before_agent_callback=[logger_before_agent_callback],
+        after_agent_callback=[logger_after_agent_callback],
+        before_tool_callback=[logger_before_tool_callback],
+        after_tool_callback=[logger_after_tool_callback],
+        on_tool_error_callback=[logger_on_tool_error_callback],
+        before_model_callback=[logger_before_model_callback, priority_before_model_callback,
+                               resolve_file_uri_before_model_callback],
+        after_model_callback=[logger_after_model_callback],
+        on_model_error_callback=[logger_on_model_error_callback],
+    )
+
+
+def create_hazard_agent(spec: HazardAgentSpec, model: RateLimitedLiteLlm = llm_model) -> Agent:
+    return Agent(
+        model=model,
+        instruction=INSTRUCTION_TEMPLATE.format(hazard=spec.hazard),
+        description=DESCRIPTION_TEMPLATE.format(hazard=spec.hazard),
+        name=spec.name,
+        output_key=f"{spec.name}_response",
+        output_schema=HazardReport,
+        tools=[],
+        **_callbacks(),
+    )
+
+
+def create_combined_hazard_agent(specs: list[HazardAgentSpec], model: RateLimitedLiteLlm = llm_model) -> Agent:
+    """One agent that analyses the media for several hazard categories, keyed by the hazard agents' names."""
+    categories = "\n".join(f"- {spec.name}: {spec.hazard} hazards" for spec in specs)
+    return Agent(
+        model=model,
+        instruction=COMBINED_INSTRUCTION_TEMPLATE.format(categories=categories),
+        description="Analyses image or video for several hazard categories in one pass.",
+        name=COMBINED_AGENT_NAME,
+        output_key=f"{COMBINED_AGENT_NAME}_response",
+        output_schema=MultiHazardReport,
+        tools=[],
+        **_callbacks(),
+    )
+
+
+def combined_agent_card(specs: list[HazardAgentSpec], url: str) -> dict:
+    """Card for the combined agent, derived from the hazard agents' cards so it needs no agent.json of its own."""
+    card = dict(specs[0].card)
+    skill = dict(card['skills'][0])
+    skill.update(name=f"{COMBINED_AGENT_NAME}_Skill",
+                 description="Analyses image or video for " + ", ".join(spec.hazard for spec in specs) + " hazards",
+                 id=f"{COMBINED_AGENT_NAME}_skill")
+    card.update(name=COMBINED_AGENT_NAME, url=url, skills=[skill],
+                description="Multi-hazard Video Risk Analyser Agent Card")
+    return card
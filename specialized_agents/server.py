@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+# Make the project packages importable when the server is started from this directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import a2a.types
+import uvicorn
+from a2a.server.apps import A2AStarletteApplication
+from a2a.server.request_handlers import DefaultRequestHandler
+from a2a.server.tasks import InMemoryTaskStore
+from a2a.types import AgentCard
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH, EXTENDED_AGENT_CARD_PATH
+from google.adk import Runner
+from google.adk.a2a.converters.part_converter import convert_genai_part_to_a2a_part
+from google.adk.a2a.executor.a2a_agent_executor import A2aAgentExecutor, A2aAgentExecutorConfig
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Part
+from pydantic import BaseModel, ValidationError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from specialized_agents.factory import (COMBINED_AGENT_NAME, combined_agent_card, create_combined_hazard_agent,
+                                        create_hazard_agent, load_specs)
+from utils.llm_limiter import llm_limiter
+from utils.mcp_session import McpSession
+from utils.session_retention import BoundedMemoryService, RetentionSessionService
+from utils.telemetry import metrics, setup_tracing
+
+logger = logging.getLogger(__name__)
+
+AGENT_HEARTBEAT_SECONDS = float(os.getenv('AGENT_HEARTBEAT_SECONDS', '10'))
+
+
+def report_part_converter(schema: type[BaseModel]) -> Callable[[Part], Optional[a2a.types.Part]]:
+    """Sends the agent's final JSON report as a DataPart, so callers read it without parsing text."""
+    def convert(part: Part) -> Optional[a2a.types.Part]:
+        if part.text and not part.thought:
+            try:
+                report = schema.model_validate_json(part.text)
+            except ValidationError:
+                pass
+            else:
+                return a2a.types.Part(root=a2a.types.DataPart(data=report.model_dump(mode='json'),
+                                                              metadata={'schema': schema.__name__}))
+        return convert_genai_part_to_a2a_part(part)
+    return convert
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.render())
+
+
+async def send_heartbeats(agents: list[dict], interval: float = AGENT_HEARTBEAT_SECONDS):
+    """Registers this server's agents as replicas in the registry, reporting the model queue as their load."""
+    async with McpSession() as session:
+        while True:
+            for agent in agents:
+                try:
+                    await session.call_tool('agent_heartbeat', {'agent_name': agent['name'], 'agent_uri': agent['uri'],
+                                                                'load': llm_limiter.load})
+                except Exception as e:
+                    logger.warning(f"Heartbeat for {agent['name']} failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(interval)
+
+
+def create_app(base_url: Optional[str] = os.getenv('AGENT_SERVER_BASE_URL')) -> Starlette:
+    """Serves every hazard agent, plus the combined multi-hazard agent, from one app under /a2a/<name>,
+    the layout `adk api_server --a2a` uses.
+
+    base_url rewrites the card URLs, e.g. when the server is not on the address the cards were written for.
+    The registered agents are listed in app.state.agents.
+    """
+    setup_tracing("specialized-agents")
+    # The agents share session, memory and task stores; app_name keeps their sessions apart.
+    # Every A2A context gets its own session, so idle ones are dropped after AGENT_SESSION_TTL_SECONDS.
+    memory_service = BoundedMemoryService()
+    session_service = RetentionSessionService(InMemorySessionService(), memory_service=memory_service,
+                                              ttl=float(os.getenv('AGENT_SESSION_TTL_SECONDS', '900')))
+    task_store = InMemoryTaskStore()
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        await session_service.start()
+        # Each server is one replica of every agent it hosts; AGENT_SERVER_BASE_URL must be its own address
+        heartbeats = asyncio.create_task(send_heartbeats(registered)) if AGENT_HEARTBEAT_SECONDS > 0 else None
+        yield
+        if heartbeats is not None:
+            heartbeats.cancel()
+            await asyncio.gather(heartbeats, return_exceptions=True)
+        await session_service.stop()
+
+    app = Starlette(routes=[Route('/metrics', metrics_endpoint, methods=['GET'])], lifespan=lifespan)
+
+    def mount(card_data: dict, agent):
+        runner = Runner(app_name=agent.name, agent=agent, session_service=session_service,
+                        memory_service=memory_service)
+        executor = A2aAgentExecutor(runner=runner, config=A2aAgentExecutorConfig(
+            gen_ai_part_converter=report_part_converter(agent.output_schema)))
+        a2a_app = A2AStarletteApplication(
+            agent_card=AgentCard(**card_data),
+            http_handler=DefaultRequestHandler(agent_executor=executor, task_store=task_store),
+        )
+        app.router.routes.extend(a2a_app.routes(
+            rpc_url=f"/a2a/{agent.name}",
+            agent_card_url=f"/a2a/{agent.name}{AGENT_CARD_WELL_KNOWN_PATH}",
+            extended_agent_card_url=f"/a2a/{agent.name}{EXTENDED_AGENT_CARD_PATH}",
+        ))
+
+    specs = load_specs()
+    registered = []
+    for spec in specs:
+        card_data = dict(spec.card)
+        if base_url:
+            card_data['url'] = f"{base_url.rstrip('/')}/a2a/{spec.name}"
+        mount(card_data, create_hazard_agent(spec))
+        registered.append({"name": spec.name, "uri": card_data['url'], "version": card_data.get('version')})
+
+    # Not registered as a hazard agent: the host calls it only in the combined analysis mode
+    if specs:
+        combined_url = registered[0]['uri'].rsplit('/', 1)[0] + f"/{COMBINED_AGENT_NAME}"
+        mount(combined_agent_card(specs, combined_url), create_combined_hazard_agent(specs))
+
+    app.state.agents = registered
+    return app
+
+
+if __name__ == "__main__":
+    # Single process. For several workers start it from the project root with
+    #   uvicorn specialized_agents.server:create_app --factory --workers 4 --port 8000
+    # Tasks live in each worker's memory, so tasks/get only finds tasks run by the same worker.
+    uvicorn.run(create_app(),
+                host=os.getenv('AGENT_SERVER_HOST', '127.0.0.1'),
+                port=int(os.getenv('AGENT_SERVER_PORT', '8000')))
@@ -0,0 +1,174 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from google.adk.events import Event, EventActions
+
+import main
+from utils import batch as batch_module
+from utils.batch import Batch, BatchRunner, BatchStatus
+from utils.media_store import MediaRef, MediaStore
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch) -> MediaStore:
+    store = MediaStore(root_dir=str(tmp_path / "artifacts"))
+    monkeypatch.setattr(batch_module, "media_store", store)
+    return store
+
+
+@pytest.fixture
+def source(tmp_path) -> Path:
+    source = tmp_path / "videos"
+    source.mkdir()
+    for name, content in [("a.mp4", b"first"), ("b.mp4", b"second"), ("c.jpg", b"third")]:
+        (source / name).write_bytes(content)
+    (source / "notes.txt").write_text("not media")
+    return source
+
+
+def new_batch(source: Path, output: Path, output_format: str = "jsonl") -> Batch:
+    return Batch(id="batch", source=str(source), output=output, output_format=output_format)
+
+
+def read_rows(output: Path) -> list[dict]:
+    return [json.loads(line) for line in output.read_text().splitlines()]
+
+
+class Analyser:
+    """Records the files it analyses; fails or blocks on the ones it is told to."""
+
+    def __init__(self, fail: tuple[str, ...] = (), block: tuple[str, ...] = ()):
+        self.fail = fail
+        self.block = block
+        self.analysed: list[str] = []
+        self.blocked = asyncio.Event()
+
+    async def __call__(self, user_id: str, media: MediaRef) -> dict:
+        content = batch_module.media_store.resolve(media.uri).read_bytes().decode()
+        if content in self.block:
+            self.blocked.set()
+            await asyncio.Event().wait()
+        if content in self.fail:
+            raise RuntimeError(f"analysis of {content} failed")
+        self.analysed.append(content)
+        return {"findings": content}
+
+
+def test_batch_writes_one_row_per_media_file(source, tmp_path):
+    output = tmp_path / "results.jsonl"
+    batch = new_batch(source, output)
+    asyncio.run(BatchRunner(Analyser(), workers=2).run(batch))
+
+    rows = read_rows(output)
+    assert batch.status == BatchStatus.SUCCEEDED
+    assert sorted(Path(row["path"]).name for row in rows) == ["a.mp4", "b.mp4", "c.jpg"]
+    assert all(row["status"] == "succeeded" for row in rows)
+    assert (batch.discovered, batch.succeeded, batch.failed) == (3, 3, 0)
+
+
+def test_rerun_skips_finished_files_and_retries_failed_ones(source, tmp_path):
+    output = tmp_path / "results.jsonl"
+    first = new_batch(source, output)
+    asyncio.run(BatchRunner(Analyser(fail=("second",)), workers=1).run(first))
+    assert (first.succeeded, first.failed) == (2, 1)
+
+    analyser = Analyser()
+    rerun = new_batch(source, output)
+    asyncio.run(BatchRunner(analyser, workers=1).run(rerun))
+
+    assert analyser.analysed == ["second"]
+    assert (rerun.resumed, rerun.succeeded, rerun.failed) == (2, 1, 0)
+    assert [row["status"] for row in read_rows(output)] == ["succeeded", "failed", "succeeded", "succeeded"]
+
+
+def test_rerun_after_an_interrupted_batch_resumes_where_it_stopped(source, tmp_path):
+    output = tmp_path / "results.jsonl"
+    analyser = Analyser(block=("second",))
+
+    async def interrupted():
+        batch = new_batch(source, output)
+        task = asyncio.create_task(BatchRunner(analyser, workers=1).run(batch))
+        await analyser.blocked.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return batch
+
+    first = asyncio.run(interrupted())
+    assert first.status == BatchStatus.CANCELLED
+    assert analyser.analysed == ["first"]
+
+    analyser = Analyser()
+    rerun = new_batch(source, output)
+    asyncio.run(BatchRunner(analyser, workers=1).run(rerun))
+    assert analyser.analysed == ["second", "third"]
+    assert rerun.resumed == 1
+    assert sorted(Path(row["path"]).name for row in read_rows(output)) == ["a.mp4", "b.mp4", "c.jpg"]
+
+
+def test_duplicate_content_is_recorded_instead_of_analysed_again(source, tmp_path):
+    (source / "copy-of-a.mp4").write_bytes(b"first")
+    output = tmp_path / "results.jsonl"
+    analyser = Analyser()
+    batch = new_batch(source, output)
+    asyncio.run(BatchRunner(analyser, workers=1).run(batch))
+
+    rows = {Path(row["path"]).name: row for row in read_rows(output)}
+    assert analyser.analysed.count("first") == 1
+    assert rows["copy-of-a.mp4"]["status"] == "duplicate"
+    assert rows["copy-of-a.mp4"]["duplicate_of"] == rows["a.mp4"]["path"]
+    assert rows["copy-of-a.mp4"]["sha256"] == rows["a.mp4"]["sha256"]
+    assert batch.duplicates == 1
+
+
+def test_content_analysed_in_an_earlier_run_is_a_duplicate(source, tmp_path):
+    output = tmp_path / "results.jsonl"
+    asyncio.run(BatchRunner(Analyser(), workers=1).run(new_batch(source, output)))
+
+    (source / "later-copy.mp4").write_bytes(b"third")
+    analyser = Analyser()
+    rerun = new_batch(source, output)
+    asyncio.run(BatchRunner(analyser, workers=1).run(rerun))
+
+    assert analyser.analysed == []
+    row = read_rows(output)[-1]
+    assert (Path(row["path"]).name, row["status"], Path(row["duplicate_of"]).name) == (
+        "later-copy.mp4", "duplicate", "c.jpg")
+
+
+def test_parquet_output_holds_every_row(source, tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    output = tmp_path / "results.parquet"
+    asyncio.run(BatchRunner(Analyser(), workers=2).run(new_batch(source, output, "parquet")))
+
+    table = pyarrow_parquet.read_table(output)
+    assert table.num_rows == 3
+    assert json.loads(table.column("result")[0].as_py()) == {"findings": "first"}
+
+
+def test_file_no_agent_analysed_is_counted_as_failed(source, tmp_path, monkeypatch):
+    async def every_agent_failed(user_id, media, on_event=None):
+        on_event(Event(author="hazard_workflow", actions=EventActions(state_delta={"succeeded_agents": []})))
+        return []
+
+    monkeypatch.setattr(main, "analyse_media", every_agent_failed)
+    output = tmp_path / "results.jsonl"
+    batch = new_batch(source, output)
+    asyncio.run(BatchRunner(main.analyse_batch_file, workers=1).run(batch))
+
+    assert (batch.succeeded, batch.failed) == (0, 3)
+    assert all(row["error"] == "RuntimeError: No agent analysed the file" for row in read_rows(output))
+
+
+def test_file_some_agent_analysed_is_counted_as_succeeded(source, tmp_path, monkeypatch):
+    async def one_agent_answered(user_id, media, on_event=None):
+        on_event(Event(author="hazard_workflow",
+                       actions=EventActions(state_delta={"succeeded_agents": ["fire_agent"]})))
+        return []
+
+    monkeypatch.setattr(main, "analyse_media", one_agent_answered)
+    batch = new_batch(source, tmp_path / "results.jsonl")
+    asyncio.run(BatchRunner(main.analyse_batch_file, workers=1).run(batch))
+
+    assert (batch.succeeded, batch.failed) == (3, 0)
@@ -0,0 +1,127 @@
+from typing import Optional
+
+from utils.hazard_schema import merge_reports, merge_segment_reports
+
+
+def finding(category: str, description: str, severity: str, timestamp: Optional[float] = None) -> dict:
+    entry = {"category": category, "description": description, "severity": severity}
+    if timestamp is not None:
+        entry["timestamp"] = timestamp
+    return entry
+
+
+def test_merge_reports_keeps_a_finding_reported_by_several_agents_once():
+    merged = merge_reports({
+        "fire_agent": {"agent": "fire_agent", "findings": [finding("Fire", "Open flame near pallets", "high", 3.0)]},
+        "ppe_agent": {"agent": "ppe_agent", "findings": [finding("fire", " open flame near pallets ", "high", 3.0)]},
+    })
+
+    assert merged["categories"]["fire"] == [
+        {"description": "Open flame near pallets", "severity": "high", "timestamp": 3.0, "agent": "fire_agent"}]
+
+
+def test_merge_reports_keeps_the_same_description_at_different_times():
+    merged = merge_reports({"fire_agent": {"agent": "fire_agent", "findings": [
+        finding("fire", "Open flame", "high", 3.0), finding("fire", "Open flame", "high", 40.0)]}})
+
+    assert [f["timestamp"] for f in merged["categories"]["fire"]] == [3.0, 40.0]
+
+
+def test_merge_reports_orders_each_category_by_severity_then_time():
+    merged = merge_reports({"agent": {"agent": "agent", "findings": [
+        finding("electrical", "Frayed cable", "low", 1.0),
+        finding("electrical", "Exposed busbar", "critical", 9.0),
+        finding("electrical", "Overloaded socket", "high", 5.0),
+        finding("electrical", "Wet junction box", "high", 2.0),
+    ]}})
+
+    assert [f["description"] for f in merged["categories"]["electrical"]] == [
+        "Exposed busbar", "Wet junction box", "Overloaded socket", "Frayed cable"]
+
+
+def test_merge_reports_lists_failed_agents_apart_from_findings():
+    merged = merge_reports({
+        "fire_agent": {"error": "TimeoutError: agent took too long"},
+        "ppe_agent": {"agent": "ppe_agent", "findings": [finding("ppe", "No helmet", "medium")],
+                      "summary": "One worker without a helmet."},
+    })
+
+    assert merged["failed_agents"] == {"fire_agent": "TimeoutError: agent took too long"}
+    assert merged["summaries"] == {"ppe_agent": "One worker without a helmet."}
+    assert list(merged["categories"]) == ["ppe"]
+
+
+def test_merge_reports_timeline_lists_every_category_in_time_order():
+    merged = merge_reports({"agent": {"agent": "agent", "findings": [
+        finding("ppe", "No helmet", "medium", 12.0),
+        finding("fire", "Smoke", "high", 4.0),
+        finding("fire", "Open flame", "critical", 12.0),
+    ]}}, timeline=True)
+
+    assert [(f["category"], f["timestamp"]) for f in merged["timeline"]] == [
+        ("fire", 4.0), ("fire", 12.0), ("ppe", 12.0)]
+    assert "categories" not in merged
+
+
+def segment(start: float, end: float) -> dict:
+    return {"start": start, "end": end}
+
+
+def report(*findings: dict, summary: str = "") -> dict:
+    return {"agent": "fire_agent", "findings": list(findings), "summary": summary}
+
+
+def test_merge_segment_reports_keeps_an_event_seen_by_two_overlapping_segments_once():
+    merged = merge_segment_reports("fire_agent", [
+        (segment(0, 60), report(finding("fire", "Smoke near the exit", "medium", 58.0))),
+        (segment(55, 115), report(finding("fire", "Smoke at the exit door", "high", 59.0))),
+    ], window=5)
+
+    # The more severe sighting wins, at the time the event was first seen
+    assert [(f["description"], f["severity"], f["timestamp"]) for f in merged["findings"]] == [
+        ("Smoke at the exit door", "high", 58.0)]
+
+
+def test_merge_segment_reports_keeps_findings_further_apart_than_the_window():
+    merged = merge_segment_reports("fire_agent", [
+        (segment(0, 60), report(finding("fire", "Smoke", "medium", 10.0))),
+        (segment(55, 115), report(finding("fire", "Smoke", "medium", 100.0))),
+    ], window=5)
+
+    assert [f["timestamp"] for f in merged["findings"]] == [10.0, 100.0]
+
+
+def test_merge_segment_reports_does_not_merge_different_categories():
+    merged = merge_segment_reports("fire_agent", [
+        (segment(0, 60), report(finding("fire", "Smoke", "medium", 58.0))),
+        (segment(55, 115), report(finding("electrical", "Sparking cable", "high", 58.0))),
+    ], window=5)
+
+    assert sorted(f["category"] for f in merged["findings"]) == ["electrical", "fire"]
+
+
+def test_merge_segment_reports_places_untimed_findings_at_their_segment_start():
+    merged = merge_segment_reports("fire_agent", [
+        (segment(55, 115), report(finding("ppe", "No helmet", "low"))),
+    ], window=5)
+
+    assert merged["findings"][0]["timestamp"] == 55
+
+
+def test_merge_segment_reports_lists_failed_segments_in_the_summary():
+    merged = merge_segment_reports("fire_agent", [
+        (segment(0, 60), report(finding("fire", "Smoke", "medium", 10.0), summary="Smoke early on.")),
+        (segment(55, 115), {"error": "TimeoutError"}),
+    ], window=5)
+
+    assert merged["summary"] == "[0s-60s] Smoke early on. Not analysed: 55s-115s"
+    assert len(merged["findings"]) == 1
+
+
+def test_merge_segment_reports_is_an_error_only_when_every_segment_failed():
+    merged = merge_segment_reports("fire_agent", [
+        (segment(0, 60), {"error": "TimeoutError"}),
+        (segment(55, 115), {"error": "CircuitOpenError"}),
+    ], window=5)
+
+    assert merged == {"error": "Every segment failed, last error: CircuitOpenError"}
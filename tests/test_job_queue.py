@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.job_queue import Job, JobManager, JobStatus
+from utils.media_store import MediaStore
+
+
+async def echo(job: Job) -> dict:
+    if job.payload.get("fail"):
+        raise RuntimeError("analysis failed")
+    return {"echo": job.payload["value"]}
+
+
+def test_submit_beyond_capacity_is_refused():
+    manager = JobManager(handler=echo, workers=1, max_queue=1)
+    manager.submit(value=1)
+    assert manager.full()
+    with pytest.raises(asyncio.QueueFull):
+        manager.submit(value=2)
+
+
+def test_reserved_slot_counts_against_capacity_until_released():
+    manager = JobManager(handler=echo, workers=1, max_queue=1)
+    with manager.reserve():
+        assert manager.full()
+        with pytest.raises(asyncio.QueueFull):
+            manager.submit(value=1)
+        with pytest.raises(asyncio.QueueFull):
+            with manager.reserve():
+                pass
+    assert not manager.full()
+
+
+def test_reserved_slot_takes_the_job_when_the_rest_of_the_queue_filled_up():
+    manager = JobManager(handler=echo, workers=1, max_queue=2)
+    with manager.reserve() as submit:
+        manager.submit(value=1)
+        job = submit(value=2)
+    assert job.status == JobStatus.QUEUED
+    assert manager.stats()["queued"] == 2
+    assert manager.stats()["reserved"] == 0
+
+
+def test_reserved_slot_is_released_when_preparing_the_job_fails():
+    manager = JobManager(handler=echo, workers=1, max_queue=1)
+    with pytest.raises(FileNotFoundError):
+        with manager.reserve():
+            raise FileNotFoundError("upload gone")
+    assert manager.stats()["reserved"] == 0
+    manager.submit(value=1)
+
+
+def test_workers_record_results_and_failures():
+    async def scenario():
+        manager = JobManager(handler=echo, workers=2, max_queue=4)
+        await manager.start()
+        succeeded = manager.submit(value=1)
+        failed = manager.submit(fail=True)
+        events = [message async for message in manager.subscribe(succeeded)]
+        [message async for message in manager.subscribe(failed)]
+        await manager.stop()
+        return succeeded, failed, events
+
+    succeeded, failed, events = asyncio.run(scenario())
+    assert (succeeded.status, succeeded.result) == (JobStatus.SUCCEEDED, {"echo": 1})
+    assert (failed.status, failed.error) == (JobStatus.FAILED, "RuntimeError: analysis failed")
+    assert [message["event"] for message in events] == ["status", "status", "result", "status"]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch) -> TestClient:
+    # Without the lifespan the workers never start, so submitted jobs stay queued
+    monkeypatch.setattr(main, "media_store", MediaStore(root_dir=str(tmp_path)))
+    monkeypatch.setattr(main, "job_manager", JobManager(handler=echo, workers=1, max_queue=1))
+    return TestClient(main.app)
+
+
+def test_full_queue_refuses_the_upload_and_keeps_it_resumable(client):
+    main.job_manager.submit(value=1)
+    upload_id = client.post("/uploads").json()["upload_id"]
+    client.put(f"/uploads/{upload_id}", params={"offset": 0}, content=b"abc")
+
+    response = client.post(f"/uploads/{upload_id}/jobs", params={"user_id": "u", "mime_type": "video/mp4"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert client.get(f"/uploads/{upload_id}").json()["offset"] == 3
+
+
+def test_completed_upload_is_queued_as_a_job(client):
+    upload_id = client.post("/uploads").json()["upload_id"]
+    client.put(f"/uploads/{upload_id}", params={"offset": 0}, content=b"abc")
+
+    response = client.post(f"/uploads/{upload_id}/jobs", params={"user_id": "u", "mime_type": "video/mp4"})
+    assert response.status_code == 202
+    job = main.job_manager.get(response.json()["job_id"])
+    assert job.payload["user_id"] == "u"
+    assert client.get(f"/uploads/{upload_id}").status_code == 404
+
+
+def test_unknown_upload_releases_its_reserved_slot(client):
+    response = client.post("/uploads/0b7c5f5e-6a43-4a57-9d8c-3f3c6a1f2b10/jobs",
+                           params={"user_id": "u", "mime_type": "video/mp4"})
+    assert response.status_code == 404
+    assert not main.job_manager.full()
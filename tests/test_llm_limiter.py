@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+from utils.llm_limiter import LlmLimiter, Priority
+
+
+async def settle():
+    # Lets granted waiters resume
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_concurrency_limit_queues_calls_until_a_slot_is_released():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=2, max_limit=2)
+        calls = [asyncio.create_task(limiter.acquire()) for _ in range(3)]
+        await settle()
+        assert [call.done() for call in calls] == [True, True, False]
+        assert limiter.load == 3
+
+        limiter.release()
+        await settle()
+        assert calls[2].done()
+        assert limiter.in_flight == 2
+
+    asyncio.run(scenario())
+
+
+def test_waiting_calls_are_granted_by_priority_then_arrival():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        order = []
+
+        async def call(name: str, priority: Priority):
+            await limiter.acquire(priority)
+            order.append(name)
+            limiter.release()
+
+        calls = [asyncio.create_task(call("batch", Priority.BATCH)),
+                 asyncio.create_task(call("first", Priority.INTERACTIVE)),
+                 asyncio.create_task(call("second", Priority.INTERACTIVE))]
+        await settle()
+        limiter.release()
+        await asyncio.gather(*calls)
+        assert order == ["first", "second", "batch"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_hold_a_slot():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await settle()
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+        limiter.release()
+        await asyncio.wait_for(limiter.acquire(), 1)
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_allows_a_burst_then_paces_calls_at_the_rate():
+    async def scenario():
+        limiter = LlmLimiter(rate=20, burst=2, initial_limit=10)
+        start = time.monotonic()
+        for _ in range(4):
+            await limiter.acquire()
+        # Two calls from the burst, then one token every 50 ms
+        assert 0.08 <= time.monotonic() - start < 0.5
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_holds_every_call_until_it_passes():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=4)
+        await limiter.acquire()
+        limiter.release(overloaded=True, retry_after=0.1)
+        start = time.monotonic()
+        await limiter.acquire()
+        assert time.monotonic() - start >= 0.09
+
+    asyncio.run(scenario())
+
+
+def test_overload_halves_the_limit_once_per_call_duration():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=16, min_limit=2)
+        for _ in range(3):
+            await limiter.acquire()
+        limiter.release(latency=5.0, overloaded=True)
+        limiter.release(latency=5.0, overloaded=True)
+        assert limiter.limit == 8
+        limiter._last_decrease -= 5.0
+        limiter.release(overloaded=True)
+        assert limiter.limit == 4
+
+    asyncio.run(scenario())
+
+
+def test_overload_never_drops_below_the_minimum():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=3, min_limit=2)
+        await limiter.acquire()
+        limiter.release(overloaded=True)
+        assert limiter.limit == 2
+
+    asyncio.run(scenario())
+
+
+def test_slow_calls_count_as_overload_when_a_latency_target_is_set():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=8, latency_target=1.0)
+        await limiter.acquire()
+        limiter.release(latency=2.0)
+        assert limiter.limit == 4
+
+    asyncio.run(scenario())
+
+
+def test_successful_calls_grow_the_limit_by_one_per_window_up_to_the_maximum():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=4, max_limit=5)
+        for _ in range(4):
+            await limiter.acquire()
+            limiter.release(latency=0.1)
+        # Each success adds 1 / limit, so a full window of successes adds about one slot
+        assert 4.9 < limiter.limit < 5
+        for _ in range(10):
+            await limiter.acquire()
+            limiter.release(latency=0.1)
+        assert limiter.limit == 5
+
+    asyncio.run(scenario())
+
+
+def test_failures_unrelated_to_load_leave_the_limit_alone():
+    async def scenario():
+        limiter = LlmLimiter(initial_limit=4)
+        await limiter.acquire()
+        limiter.release()
+        assert limiter.limit == 4
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from utils.media_store import MediaStore
+
+
+async def chunks(*parts: bytes, delay: float = 0.0):
+    for part in parts:
+        await asyncio.sleep(delay)
+        yield part
+
+
+@pytest.fixture
+def store(tmp_path) -> MediaStore:
+    return MediaStore(root_dir=str(tmp_path), upload_ttl=60)
+
+
+def test_chunks_resume_at_the_confirmed_offset(store):
+    async def scenario():
+        upload_id = await store.begin_upload()
+        assert await store.append_chunks(upload_id, 0, chunks(b"abc")) == 3
+        assert await store.append_chunks(upload_id, 3, chunks(b"def")) == 6
+        media = await store.complete_upload(upload_id, "video/mp4")
+        assert store.resolve(media.uri).read_bytes() == b"abcdef"
+
+    asyncio.run(scenario())
+
+
+def test_chunk_at_the_wrong_offset_is_rejected(store):
+    async def scenario():
+        upload_id = await store.begin_upload()
+        await store.append_chunks(upload_id, 0, chunks(b"abc"))
+        with pytest.raises(ValueError, match="expects offset 3"):
+            await store.append_chunks(upload_id, 0, chunks(b"abc"))
+        assert store.upload_offset(upload_id) == 3
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_chunks_to_one_upload_are_serialised(store):
+    async def scenario():
+        upload_id = await store.begin_upload()
+        first = asyncio.create_task(store.append_chunks(upload_id, 0, chunks(b"aa", b"aa", delay=0.01)))
+        second = asyncio.create_task(store.append_chunks(upload_id, 0, chunks(b"bbbb")))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+
+        # The second writer waits for the first, then finds the offset has moved on
+        assert results[0] == 4
+        assert isinstance(results[1], ValueError)
+        media = await store.complete_upload(upload_id, "video/mp4")
+        assert store.resolve(media.uri).read_bytes() == b"aaaa"
+
+    asyncio.run(scenario())
+
+
+def test_chunk_waiting_while_the_upload_completes_finds_it_gone(store):
+    async def scenario():
+        upload_id = await store.begin_upload()
+        await store.append_chunks(upload_id, 0, chunks(b"abc"))
+        complete = asyncio.create_task(store.complete_upload(upload_id, "video/mp4"))
+        late = asyncio.create_task(store.append_chunks(upload_id, 3, chunks(b"def")))
+        await complete
+        with pytest.raises(FileNotFoundError):
+            await late
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("upload_id", ["not-a-uuid", "../../etc/passwd", "../blobs/x", ""])
+def test_malformed_or_traversal_upload_ids_are_unknown(store, upload_id):
+    with pytest.raises(FileNotFoundError):
+        store.upload_offset(upload_id)
+
+
+def test_unknown_well_formed_upload_id_is_unknown(store):
+    with pytest.raises(FileNotFoundError):
+        store.upload_offset("0b7c5f5e-6a43-4a57-9d8c-3f3c6a1f2b10")
+
+
+def test_upload_survives_a_restart_and_is_rehashed_on_completion(store, tmp_path):
+    async def scenario():
+        upload_id = await store.begin_upload()
+        await store.append_chunks(upload_id, 0, chunks(b"abc"))
+        restarted = MediaStore(root_dir=str(tmp_path))
+        assert restarted.upload_offset(upload_id) == 3
+        await restarted.append_chunks(upload_id, 3, chunks(b"def"))
+        fresh = await MediaStore(root_dir=str(tmp_path / "other")).ingest(chunks(b"abcdef"), "video/mp4")
+        assert (await restarted.complete_upload(upload_id, "video/mp4")).sha256 == fresh.sha256
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_uploads_expire(store):
+    async def scenario():
+        stale = await store.begin_upload()
+        active = await store.begin_upload()
+        stale_path = store.upload_dir / f"{stale}.part"
+        an_hour_ago = time.time() - 3600
+        os.utime(stale_path, (an_hour_ago, an_hour_ago))
+
+        assert await store.expire_uploads() == 1
+        assert not stale_path.exists()
+        with pytest.raises(FileNotFoundError):
+            store.upload_offset(stale)
+        assert store.upload_offset(active) == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("uri", ["file:///etc/passwd", "/etc/passwd", "https://example.com/video.mp4"])
+def test_resolve_refuses_uris_outside_the_artifact_directory(store, uri):
+    with pytest.raises(ValueError):
+        store.resolve(uri)
+
+
+def test_resolve_refuses_traversal_out_of_the_artifact_directory(store):
+    with pytest.raises(ValueError):
+        store.resolve((store.blob_dir / ".." / ".." / "secret.mp4").as_uri())
+
+
+def test_resolve_accepts_files_in_the_artifact_directory(store):
+    path = store.blob_dir / "abc.mp4"
+    assert store.resolve(path.as_uri()) == path
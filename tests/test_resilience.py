@@ -0,0 +1,102 @@
+import pytest
+
+from mcp_server.a2a_client import resilience
+from mcp_server.a2a_client.resilience import CircuitBreaker, CircuitOpenError, ResilientA2aCaller
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    assert breaker.on_failure() is False
+    assert breaker.on_failure() is False
+    assert breaker.on_failure() is True
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.on_failure()
+    breaker.on_success(0.1)
+    assert breaker.on_failure() is False
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_lets_one_probe_through_after_the_reset_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.on_failure()
+    clock.now += 29
+    assert breaker.state == "open"
+
+    clock.now += 1
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    breaker.on_start()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.on_failure()
+    clock.now += 30
+    breaker.on_start()
+    breaker.on_success(0.2)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker_for_another_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.on_failure()
+    clock.now += 30
+    breaker.on_start()
+    assert breaker.on_failure() is True
+    assert breaker.state == "open"
+    clock.now += 30
+    assert breaker.state == "half_open"
+
+
+def test_latency_is_smoothed_across_calls(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.on_success(1.0)
+    breaker.on_success(2.0)
+    assert breaker.latency == pytest.approx(1.2)
+
+
+def test_pick_skips_replicas_with_an_open_circuit(clock):
+    caller = ResilientA2aCaller(failure_threshold=1, balancing="least_loaded")
+    replicas = [{"uri": "http://a"}, {"uri": "http://b"}]
+    caller.breaker("http://a").on_failure()
+    assert caller.pick(replicas) == "http://b"
+
+
+def test_pick_prefers_replicas_not_yet_tried(clock):
+    caller = ResilientA2aCaller(balancing="least_loaded")
+    replicas = [{"uri": "http://a"}, {"uri": "http://b"}]
+    assert caller.pick(replicas, exclude=("http://a",)) == "http://b"
+    # With every replica tried, one is reused rather than failing
+    assert caller.pick(replicas, exclude=("http://a", "http://b")) in ("http://a", "http://b")
+
+
+def test_pick_fails_fast_when_every_circuit_is_open(clock):
+    caller = ResilientA2aCaller(failure_threshold=1)
+    replicas = [{"uri": "http://a"}, {"uri": "http://b"}]
+    for replica in replicas:
+        caller.breaker(replica["uri"]).on_failure()
+    with pytest.raises(CircuitOpenError):
+        caller.pick(replicas)
@@ -0,0 +1,74 @@
+import asyncio
+import itertools
+
+import pytest
+
+from root_agent.agent import HostAgent
+from utils import result_cache as result_cache_module
+from utils.result_cache import ResultCache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # Every put and get happens at a distinct, increasing time, so recency is unambiguous
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(result_cache_module.time, "time", lambda: float(next(ticks)))
+
+
+def new_cache(tmp_path, **limits) -> ResultCache:
+    return ResultCache(path=str(tmp_path / "cache.sqlite3"), enabled=True, **limits)
+
+
+def test_changed_agent_version_misses_the_cache(tmp_path):
+    async def scenario():
+        cache = new_cache(tmp_path)
+        await cache.put(ResultCache.make_key("sha", "fire_agent", "1.0", "model"), {"findings": []})
+        assert await cache.get(ResultCache.make_key("sha", "fire_agent", "1.0", "model")) == {"findings": []}
+        assert await cache.get(ResultCache.make_key("sha", "fire_agent", "1.1", "model")) is None
+        assert await cache.get(ResultCache.make_key("sha", "fire_agent", "1.0", "other-model")) is None
+
+    asyncio.run(scenario())
+
+
+def test_host_agent_keys_change_with_the_registered_agent_version():
+    host_agent = HostAgent()
+    host_agent.agents = [{"name": "fire_agent", "version": "1.0"}]
+    before = host_agent._result_cache_key("file:///video.mp4", "fire_agent", "http://fire")
+    host_agent.agents = [{"name": "fire_agent", "version": "1.1"}]
+    assert host_agent._result_cache_key("file:///video.mp4", "fire_agent", "http://fire") != before
+
+
+def test_entry_limit_evicts_the_least_recently_used(tmp_path):
+    async def scenario():
+        cache = new_cache(tmp_path, max_entries=2)
+        await cache.put("a", 1)
+        await cache.put("b", 2)
+        await cache.put("c", 3)
+        assert [await cache.get(key) for key in "abc"] == [None, 2, 3]
+
+        # Reading b makes c the oldest
+        await cache.get("b")
+        await cache.put("d", 4)
+        assert [await cache.get(key) for key in "bcd"] == [2, None, 4]
+
+    asyncio.run(scenario())
+
+
+def test_byte_limit_evicts_until_the_rest_fits(tmp_path):
+    async def scenario():
+        cache = new_cache(tmp_path, max_bytes=20)
+        await cache.put("a", "x" * 10)
+        await cache.put("b", "y" * 10)
+        assert await cache.get("a") is None
+        assert await cache.get("b") == "y" * 10
+
+    asyncio.run(scenario())
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    async def scenario():
+        cache = ResultCache(path=str(tmp_path / "cache.sqlite3"), enabled=False)
+        await cache.put("a", 1)
+        assert await cache.get("a") is None
+
+    asyncio.run(scenario())
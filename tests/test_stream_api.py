@@ -0,0 +1,102 @@
+import json
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from root_agent.agent import HostAgent
+from utils.media_store import MediaRef, MediaStore
+
+
+def fire_report(description: str) -> dict:
+    return {"agent": "fire_agent", "findings": [{"category": "fire", "description": description, "severity": "high"}]}
+
+
+class Normalizer:
+    async def normalize(self, media: MediaRef) -> MediaRef:
+        return media
+
+
+class Agents:
+    """Streams the given findings, then raises the given error if any."""
+
+    def __init__(self, findings: list[dict], error: Exception = None):
+        self.findings = findings
+        self.error = error
+
+    async def stream_all_agents(self, file_uri: str, mime_type: str):
+        for finding in self.findings:
+            yield finding
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def post(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "media_store", MediaStore(root_dir=str(tmp_path)))
+    monkeypatch.setattr(main, "media_normalizer", Normalizer())
+
+    async def no_second_run(*args, **kwargs):
+        raise AssertionError("The stream must not analyse the media again")
+
+    monkeypatch.setattr(main, "analyse_media", no_second_run)
+
+    def post(agents: Agents) -> list[tuple[str, dict]]:
+        # Assigned by the lifespan, which the test client does not run
+        monkeypatch.setattr(main, "host_agent", agents, raising=False)
+        response = TestClient(main.app).post("/upload_video/stream", params={"user_id": "u"},
+                                             files={"file": ("clip.mp4", b"frames", "video/mp4")})
+        assert response.status_code == 200
+        events = []
+        for block in response.text.strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return events
+
+    return post
+
+
+def test_report_is_merged_from_the_streamed_findings(post):
+    events = post(Agents([
+        {"agent": "fire_agent", "kind": "status-update", "text": "Looking", "final": False},
+        HostAgent._result_finding("fire_agent", fire_report("Open flame")),
+        HostAgent._result_finding("ppe_agent", {"error": "TimeoutError"}),
+    ]))
+
+    assert [event for event, _ in events] == ["finding", "finding", "finding", "report"]
+    report = events[-1][1]
+    assert [f["description"] for f in report["categories"]["fire"]] == ["Open flame"]
+    assert report["failed_agents"] == {"ppe_agent": "TimeoutError"}
+
+
+def test_segment_findings_are_merged_per_agent(post, monkeypatch):
+    monkeypatch.setattr(main, "load_segment_set", lambda uri: {"overlap_seconds": 5})
+
+    class SegmentNormalizer:
+        async def normalize(self, media: MediaRef) -> MediaRef:
+            return replace(media, mime_type=main.SEGMENT_SET_MIME_TYPE)
+
+    monkeypatch.setattr(main, "media_normalizer", SegmentNormalizer())
+    events = post(Agents([
+        HostAgent._result_finding("fire_agent", fire_report("Smoke")) | {"segment": {"start": 0, "end": 60}},
+        HostAgent._result_finding("fire_agent", {"error": "TimeoutError"}) | {"segment": {"start": 55, "end": 115}},
+    ]))
+
+    report = events[-1][1]
+    assert [(f["description"], f["timestamp"]) for f in report["timeline"]] == [("Smoke", 0)]
+    assert report["summaries"]["fire_agent"].endswith("Not analysed: 55s-115s")
+
+
+def test_failure_mid_stream_is_reported_as_an_error_event(post):
+    events = post(Agents([HostAgent._result_finding("fire_agent", fire_report("Open flame"))],
+                         error=RuntimeError("connection reset")))
+
+    assert events[-1] == ("error", {"detail": "RuntimeError: connection reset"})
+    assert "report" not in [event for event, _ in events]
+
+
+def test_registry_outage_is_reported_as_an_error_event(post):
+    events = post(Agents([], error=main.RegistryUnavailableError("registry down")))
+
+    assert events == [("error", {"detail": "Agent registry unavailable: registry down"})]
@@ -0,0 +1,45 @@
+import pytest
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from mcp_server.a2a_client.a2a_client import file_message_params
+from utils.telemetry import extract_trace_context, inject_trace_context, setup_tracing, traced
+
+
+@pytest.fixture(scope="module")
+def spans() -> InMemorySpanExporter:
+    exporter = InMemorySpanExporter()
+    setup_tracing("tests").add_span_processor(SimpleSpanProcessor(exporter))
+    return exporter
+
+
+def test_a2a_request_carries_the_callers_traceparent(spans):
+    with traced("http.request", "test_duration_seconds") as root:
+        params = file_message_params("message-1", "image/jpeg", "file:///frame.jpg", "Analyze this for hazards")
+
+    context = root.get_span_context()
+    _, trace_id, span_id, _ = params.metadata["traceparent"].split("-")
+    assert trace_id == format(context.trace_id, "032x")
+    assert span_id == format(context.span_id, "016x")
+
+
+def test_agent_span_continues_the_callers_trace(spans):
+    spans.clear()
+    with traced("http.request", "test_duration_seconds") as root:
+        carrier = inject_trace_context()
+    # As the MCP server and the agents do with the context they receive
+    with traced("agent.run", "test_duration_seconds", context=extract_trace_context(carrier)) as child:
+        pass
+
+    assert child.get_span_context().trace_id == root.get_span_context().trace_id
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    assert finished["agent.run"].parent.span_id == root.get_span_context().span_id
+
+
+def test_setup_tracing_keeps_the_first_provider(spans):
+    assert setup_tracing("another-service") is setup_tracing("tests")
+
+
+def test_unknown_exporter_is_rejected():
+    with pytest.raises(ValueError):
+        setup_tracing("tests", exporter="jaeger")
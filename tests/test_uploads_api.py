@@ -0,0 +1,27 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils.media_store import MediaStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch) -> TestClient:
+    # Without the lifespan: these endpoints only need the media store
+    monkeypatch.setattr(main, "media_store", MediaStore(root_dir=str(tmp_path)))
+    return TestClient(main.app)
+
+
+def test_chunk_at_the_wrong_offset_is_a_conflict(client):
+    upload_id = client.post("/uploads").json()["upload_id"]
+    assert client.put(f"/uploads/{upload_id}", params={"offset": 0}, content=b"abc").json()["offset"] == 3
+
+    response = client.put(f"/uploads/{upload_id}", params={"offset": 0}, content=b"abc")
+    assert response.status_code == 409
+    assert client.get(f"/uploads/{upload_id}").json()["offset"] == 3
+
+
+@pytest.mark.parametrize("upload_id", ["not-a-uuid", "...", "0b7c5f5e-6a43-4a57-9d8c-3f3c6a1f2b10"])
+def test_unknown_or_malformed_upload_is_not_found(client, upload_id):
+    assert client.get(f"/uploads/{upload_id}").status_code == 404
+    assert client.put(f"/uploads/{upload_id}", params={"offset": 0}, content=b"abc").status_code == 404
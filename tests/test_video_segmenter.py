@@ -0,0 +1,41 @@
+from utils.video_segmenter import Segment, plan_segments
+
+
+def test_video_shorter_than_a_segment_is_one_segment():
+    assert plan_segments(42.5, segment_seconds=60, overlap_seconds=5) == [Segment(0, 0.0, 42.5)]
+
+
+def test_video_of_exactly_one_segment_is_not_split():
+    assert plan_segments(60, segment_seconds=60, overlap_seconds=5) == [Segment(0, 0.0, 60)]
+
+
+def test_segments_overlap_and_the_last_one_ends_with_the_video():
+    assert plan_segments(120, segment_seconds=60, overlap_seconds=5) == [
+        Segment(0, 0.0, 60), Segment(1, 55, 115), Segment(2, 110, 120)]
+
+
+def test_without_overlap_segments_are_contiguous():
+    assert plan_segments(25, segment_seconds=10, overlap_seconds=0) == [
+        Segment(0, 0.0, 10), Segment(1, 10, 20), Segment(2, 20, 25)]
+
+
+def test_overlap_is_capped_at_half_a_segment_so_planning_always_advances():
+    segments = plan_segments(30, segment_seconds=10, overlap_seconds=50)
+
+    assert [segment.start for segment in segments] == [0.0, 5, 10, 15, 20]
+    assert segments[-1].end == 30
+
+
+def test_segments_cover_the_whole_video_in_order():
+    duration = 3601.7
+    segments = plan_segments(duration, segment_seconds=60, overlap_seconds=5)
+
+    assert [segment.index for segment in segments] == list(range(len(segments)))
+    assert segments[0].start == 0 and segments[-1].end == duration
+    for previous, current in zip(segments, segments[1:]):
+        assert current.start < previous.end
+        assert current.end > previous.end
+
+
+def test_empty_video_is_one_empty_segment():
+    assert plan_segments(0, segment_seconds=60, overlap_seconds=5) == [Segment(0, 0.0, 0)]
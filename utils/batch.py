@@ -0,0 +1,370 @@
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from utils.media_store import MediaRef, media_store
+from utils.telemetry import metrics
+
+MEDIA_PREFIXES = ("video/", "image/")
+
+
+def _mime_type(path: Path) -> Optional[str]:
+    mime_type, _ = mimetypes.guess_type(path.name)
+    return mime_type if mime_type and mime_type.startswith(MEDIA_PREFIXES) else None
+
+
+def _outside(path: Path, confine_to: Optional[Path]) -> bool:
+    if confine_to is None or path.resolve().is_relative_to(confine_to):
+        return False
+    logging.warning(f"Skipping {path}: outside {confine_to}")
+    return True
+
+
+def discover(source: str, confine_to: Optional[Path] = None) -> Iterator[tuple[Path, str]]:
+    """Yields (path, mime_type) for every video or image in a directory tree, or listed in a manifest.
+
+    A manifest is a text file with one path per line, or JSONL with {"path", "mime_type"} objects; relative
+    paths are taken from the manifest's directory. Files without a video or image MIME type are skipped, and
+    so are files that resolve outside confine_to when it is given.
+    """
+    root = Path(source).expanduser()
+    if root.is_dir():
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and (mime_type := _mime_type(path)) and not _outside(path, confine_to):
+                yield path, mime_type
+        return
+
+    with open(root) as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"path": line}
+            path = Path(entry["path"]).expanduser()
+            if not path.is_absolute():
+                path = root.parent / path
+            mime_type = entry.get("mime_type") or _mime_type(path)
+            if mime_type is None:
+                logging.warning(f"Skipping {path}: not a video or image")
+                continue
+            if _outside(path, confine_to):
+                continue
+            yield path, mime_type
+
+
+class JsonlWriter:
+    """Appends one JSON object per line and flushes each, so readers can follow the file as it grows."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "a")
+
+    def write(self, row: dict) -> list[dict]:
+        """Writes the row; returns the rows now durable on disk."""
+        self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+        return [row]
+
+    def close(self) -> list[dict]:
+        self._file.close()
+        return []
+
+
+class ParquetWriter:
+    """Buffers rows into Parquet row groups. A resumed batch writes its rows to a new part file next to the first."""
+
+    def __init__(self, path: Path, row_group_size: int = int(os.getenv("BATCH_PARQUET_ROW_GROUP", "100"))):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self._pyarrow = pyarrow
+        # The report is kept as a JSON string so the schema does not depend on its shape
+        self.schema = pyarrow.schema([
+            ("path", pyarrow.string()), ("sha256", pyarrow.string()), ("mime_type", pyarrow.string()),
+            ("size", pyarrow.int64()), ("status", pyarrow.string()), ("duplicate_of", pyarrow.string()),
+            ("result", pyarrow.string()), ("error", pyarrow.string()), ("duration_seconds", pyarrow.float64())])
+        part = 0
+        while path.exists():
+            part += 1
+            path = path.with_name(f"{path.stem.split('.part')[0]}.part{part}{path.suffix}")
+        self.path = path
+        self.row_group_size = row_group_size
+        self._rows: list[dict] = []
+        self._writer = pyarrow.parquet.ParquetWriter(str(path), self.schema)
+
+    def _flush(self) -> list[dict]:
+        rows, self._rows = self._rows, []
+        if rows:
+            columns = {name: [row.get(name) for row in rows] for name in self.schema.names}
+            columns["result"] = [json.dumps(value) if value is not None else None for value in columns["result"]]
+            self._writer.write_table(self._pyarrow.table(columns, schema=self.schema))
+        return rows
+
+    def write(self, row: dict) -> list[dict]:
+        self._rows.append(row)
+        return self._flush() if len(self._rows) >= self.row_group_size else []
+
+    def close(self) -> list[dict]:
+        rows = self._flush()
+        self._writer.close()
+        return rows
+
+
+class BatchStatus(str, Enum):
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class Batch:
+    id: str
+    source: str
+    output: Path
+    output_format: str = "jsonl"
+    user_id: str = "batch"
+    # Files the batch may read; None (the CLI) reads whatever the source lists
+    confine_to: Optional[Path] = None
+    status: BatchStatus = BatchStatus.RUNNING
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    discovered: int = 0
+    resumed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status != BatchStatus.RUNNING
+
+    def to_dict(self) -> dict:
+        return {
+            "batch_id": self.id,
+            "source": self.source,
+            "output": str(self.output),
+            "format": self.output_format,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "discovered": self.discovered,
+            "resumed": self.resumed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "error": self.error,
+        }
+
+
+class BatchRunner:
+    """Analyses every file of a directory or manifest with a pool of workers, writing one result row per file.
+
+    Files are deduplicated by content hash: a file whose content was already analysed, in this run or a previous
+    one, gets a 'duplicate' row pointing at the first path instead of a second analysis. Every row durably
+    written is also recorded in a checkpoint file next to the output; running the same batch again skips the
+    files listed there, except failed ones, so an interrupted back-audit resumes where it stopped.
+    """
+
+    def __init__(self,
+                 analyse: Callable[[str, MediaRef], Awaitable[Any]],
+                 workers: int = int(os.getenv("BATCH_WORKERS", "4")),
+                 max_pending: int = int(os.getenv("BATCH_QUEUE_SIZE", "100"))):
+        self.analyse = analyse
+        self.workers = workers
+        self.max_pending = max_pending
+
+    @staticmethod
+    def checkpoint_path(output: Path) -> Path:
+        return output.with_name(f"{output.name}.checkpoint")
+
+    @staticmethod
+    def _load_checkpoint(path: Path) -> tuple[set[str], dict[str, str]]:
+        """Paths already done (failed ones are tried again), and the first path analysed for each content hash."""
+        paths, hashes = set(), {}
+        if path.exists():
+            with open(path) as checkpoint:
+                for line in checkpoint:
+                    entry = json.loads(line)
+                    if entry["status"] != "failed":
+                        paths.add(entry["path"])
+                    if entry["status"] == "succeeded":
+                        hashes.setdefault(entry["sha256"], entry["path"])
+        return paths, hashes
+
+    async def run(self, batch: Batch):
+        checkpoint_path = self.checkpoint_path(batch.output)
+        done_paths: set[str] = set()
+        analysed: dict[str, str] = {}
+        writer = checkpoint = None
+        # Content hash -> future of the first analysis of that content in this run
+        in_flight: dict[str, asyncio.Future] = {}
+        queue: asyncio.Queue[Optional[tuple[Path, str]]] = asyncio.Queue(maxsize=self.max_pending)
+
+        def checkpoint_rows(rows: list[dict]):
+            for row in rows:
+                checkpoint.write(json.dumps({key: row[key] for key in ("path", "sha256", "status")}) + "\n")
+            checkpoint.flush()
+
+        def record(row: dict):
+            checkpoint_rows(writer.write(row))
+            if row["status"] == "succeeded":
+                batch.succeeded += 1
+            elif row["status"] == "duplicate":
+                batch.duplicates += 1
+            else:
+                batch.failed += 1
+            metrics.increment('batch_files_total', status=row["status"])
+
+        async def process(path: Path, mime_type: str) -> dict:
+            start = time.perf_counter()
+            row = {"path": str(path), "sha256": None, "mime_type": mime_type, "size": None,
+                   "status": "failed", "duplicate_of": None, "result": None, "error": None}
+            try:
+                media = await media_store.add_file(str(path), mime_type)
+                row |= {"sha256": media.sha256, "size": media.size}
+                if media.sha256 in analysed:
+                    return row | {"status": "duplicate", "duplicate_of": analysed[media.sha256]}
+                while media.sha256 in in_flight:
+                    first_path = await asyncio.shield(in_flight[media.sha256])
+                    if first_path is not None:
+                        return row | {"status": "duplicate", "duplicate_of": first_path}
+                first = in_flight[media.sha256] = asyncio.get_running_loop().create_future()
+                try:
+                    row |= {"status": "succeeded", "result": await self.analyse(batch.user_id, media)}
+                    analysed[media.sha256] = str(path)
+                    first.set_result(str(path))
+                except BaseException:
+                    # Later copies of this content are analysed again rather than marked as duplicates
+                    first.set_result(None)
+                    in_flight.pop(media.sha256, None)
+                    raise
+            except Exception as e:
+                logging.error(f"Batch {batch.id} failed on {path}: {type(e).__name__}: {e}")
+                row["error"] = f"{type(e).__name__}: {e}"
+            finally:
+                row["duration_seconds"] = round(time.perf_counter() - start, 3)
+            return row
+
+        async def produce():
+            for path, mime_type in await asyncio.to_thread(list, discover(batch.source, batch.confine_to)):
+                batch.discovered += 1
+                if str(path) in done_paths:
+                    batch.resumed += 1
+                    continue
+                await queue.put((path, mime_type))
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def worker():
+            while (item := await queue.get()) is not None:
+                record(await process(*item))
+
+        tasks: list[asyncio.Task] = []
+        try:
+            done_paths, analysed = await asyncio.to_thread(self._load_checkpoint, checkpoint_path)
+            writer = await asyncio.to_thread(ParquetWriter if batch.output_format == "parquet" else JsonlWriter, batch.output)
+            checkpoint = await asyncio.to_thread(open, checkpoint_path, "a")
+            tasks = [asyncio.create_task(produce())] + [asyncio.create_task(worker()) for _ in range(self.workers)]
+            await asyncio.gather(*tasks)
+            batch.status = BatchStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            batch.status = BatchStatus.CANCELLED
+            raise
+        except Exception as e:
+            batch.status = BatchStatus.FAILED
+            batch.error = f"{type(e).__name__}: {e}"
+            logging.error(f"Batch {batch.id} failed: {batch.error}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if writer is not None:
+                rows = writer.close()
+                if checkpoint is not None:
+                    checkpoint_rows(rows)
+            if checkpoint is not None:
+                checkpoint.close()
+            batch.finished_at = time.time()
+            logging.info(f"Batch {batch.id} {batch.status.value}: {batch.succeeded} analysed, {batch.failed} failed, "
+                         f"{batch.duplicates} duplicates, {batch.resumed} already done")
+
+
+class BatchManager:
+    """Runs batches in the background for the HTTP API, one BatchRunner task per batch.
+
+    API callers name files on this host, so sources, outputs and the files a manifest lists must all lie under
+    BATCH_ROOT; relative paths are taken from it.
+    """
+
+    def __init__(self, runner: BatchRunner, root_dir: str = os.getenv("BATCH_ROOT", "batches")):
+        self.runner = runner
+        self.root = Path(root_dir).expanduser().resolve()
+        self.batches: dict[str, Batch] = {}
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        return self.batches.get(batch_id)
+
+    def _confine(self, path: str) -> Path:
+        resolved = (self.root / path).resolve()
+        if not resolved.is_relative_to(self.root):
+            raise ValueError(f"{path} is outside BATCH_ROOT")
+        return resolved
+
+    def submit(self, source: str, output: str, output_format: str = "jsonl", user_id: str = "batch") -> Batch:
+        """Starts a batch; raises ValueError when a path is outside BATCH_ROOT, the source does not exist or
+        another batch writes the output."""
+        if output_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown output format {output_format}")
+        source_path = self._confine(source)
+        if not source_path.exists():
+            raise ValueError(f"No such directory or manifest: {source}")
+        output_path = self._confine(output)
+        if any(not batch.done and batch.output == output_path for batch in self.batches.values()):
+            raise ValueError(f"A running batch already writes {output_path}")
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        batch = Batch(id=str(uuid.uuid4()), source=str(source_path), output=output_path, output_format=output_format,
+                      user_id=user_id, confine_to=self.root)
+        batch.task = asyncio.create_task(self.runner.run(batch))
+        self.batches[batch.id] = batch
+        return batch
+
+    @staticmethod
+    async def follow(batch: Batch, poll_interval: float = 1.0) -> AsyncIterator[str]:
+        """Yields the JSONL output's lines, including rows from earlier runs, and follows it until the batch ends."""
+        while not batch.output.exists():
+            if batch.done:
+                return
+            await asyncio.sleep(poll_interval)
+        with open(batch.output) as results:
+            pending = ""
+            while True:
+                # Read the done flag first so rows written just before the batch ended are not missed
+                finished = batch.done
+                pending += await asyncio.to_thread(results.read)
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    yield line + "\n"
+                if finished:
+                    return
+                await asyncio.sleep(poll_interval)
+
+    async def cancel(self, batch: Batch):
+        if batch.task is not None:
+            batch.task.cancel()
+            await asyncio.gather(batch.task, return_exceptions=True)
+
+    async def stop(self):
+        await asyncio.gather(*(self.cancel(batch) for batch in self.batches.values()))
@@ -1,9 +1,18 @@
+import asyncio
 import logging
+import time
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import BaseTool
 from google.adk.tools import ToolContext
 from typing import Dict, Any
-from google.adk.models import LlmRequest
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai.types import Blob, Part
+from opentelemetry import trace
+
+from utils.frame_sampler import FRAME_SET_MIME_TYPE, load_frame_set
+from utils.llm_limiter import Priority, llm_priority
+from utils.media_store import media_store
+from utils.telemetry import extract_trace_context, metrics, tracer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,21 +20,110 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S',
 )
 
+# Open spans and start times keyed by (kind, invocation or call id, name); closed by the matching after-callback
+_active_spans: dict[tuple, tuple[trace.Span, float]] = {}
+
+def _start_span(key: tuple, span_name: str, context=None, **attributes):
+    span = tracer.start_span(span_name, context=context, attributes=attributes)
+    _active_spans[key] = (span, time.perf_counter())
+
+def _end_span(key: tuple, metric: str, **labels) -> float:
+    span, start = _active_spans.pop(key, (None, time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    if span is not None:
+        span.end()
+    metrics.observe(metric, elapsed, **labels)
+    return elapsed
+
+def _a2a_metadata(callback_context: CallbackContext) -> dict:
+    run_config = callback_context.run_config
+    custom_metadata = (run_config.custom_metadata or {}) if run_config else {}
+    return custom_metadata.get('a2a_metadata') or {}
+
+def _a2a_trace_context(callback_context: CallbackContext):
+    # Specialized agents receive the caller's traceparent in the A2A request metadata
+    return extract_trace_context(_a2a_metadata(callback_context))
+
 async def logger_before_agent_callback(callback_context: CallbackContext):
+    _start_span(('agent', callback_context.invocation_id, callback_context.agent_name), f'agent.{callback_context.agent_name}',
+                context=_a2a_trace_context(callback_context), agent=callback_context.agent_name)
     logging.info(f'Agent {callback_context.agent_name} is being executed for session {callback_context.session.id} and invocation {callback_context.invocation_id}')
 
 async def logger_after_agent_callback(callback_context: CallbackContext):
-    logging.info(f'Agent {callback_context.agent_name} execution completed for session {callback_context.session.id} and invocation {callback_context.invocation_id}')
+    elapsed = _end_span(('agent', callback_context.invocation_id, callback_context.agent_name), 'agent_run_duration_seconds',
+                        agent=callback_context.agent_name)
+    logging.info(f'Agent {callback_context.agent_name} execution completed in {elapsed:.2f}s for session {callback_context.session.id} and invocation {callback_context.invocation_id}')
 
 async def logger_before_tool_callback(tool:BaseTool, args:dict[str, Any], tool_context: ToolContext):
+    _start_span(('tool', tool_context.function_call_id, tool.name), f'tool.{tool.name}', tool=tool.name)
     logging.info(f"Tool {tool.name} is being executed=  by agent {tool_context.agent_name} for session {tool_context.session.id} and invocation {tool_context.invocation_id}")
 
 async def logger_after_tool_callback(tool:BaseTool, dict:dict[str, Any], tool_context: ToolContext, response:dict):
-    logging.info(f"Tool {tool.name} is  executed  by agent {tool_context.agent_name} for session {tool_context.session.id} and invocation {tool_context.invocation_id}")
+    elapsed = _end_span(('tool', tool_context.function_call_id, tool.name), 'tool_duration_seconds', tool=tool.name)
+    logging.info(f"Tool {tool.name} is  executed in {elapsed:.2f}s by agent {tool_context.agent_name} for session {tool_context.session.id} and invocation {tool_context.invocation_id}")
 
 async def logger_on_tool_error_callback(tool:BaseTool, dict:dict[str, Any], tool_context: ToolContext, exception:BaseException):
+    _end_span(('tool', tool_context.function_call_id, tool.name), 'tool_duration_seconds', tool=tool.name)
+    metrics.increment('tool_errors_total', tool=tool.name)
     logging.error(f"Exception {exception} occurred while Tool {tool.name} is  being executed by agent {tool_context.agent_name} for session {tool_context.session.id} and invocation {tool_context.invocation_id}")
 
+async def logger_before_model_callback(callback_context: CallbackContext, llm_request: LlmRequest):
+    _start_span(('model', callback_context.invocation_id, callback_context.agent_name), 'llm.generate_content',
+                agent=callback_context.agent_name, model=llm_request.model or '')
+
+async def priority_before_model_callback(callback_context: CallbackContext, llm_request: LlmRequest):
+    # The caller's LLM priority travels in the A2A request metadata; the model call runs in this task's context
+    priority = _a2a_metadata(callback_context).get('priority')
+    if priority is not None:
+        llm_priority.set(Priority(int(priority)))
+
+async def logger_after_model_callback(callback_context: CallbackContext, llm_response: LlmResponse):
+    if llm_response.partial:
+        return
+    key = ('model', callback_context.invocation_id, callback_context.agent_name)
+    usage = llm_response.usage_metadata
+    if usage is not None and key in _active_spans:
+        _active_spans[key][0].set_attributes({
+            'llm.prompt_tokens': usage.prompt_token_count or 0,
+            'llm.completion_tokens': usage.candidates_token_count or 0,
+        })
+    if usage is not None:
+        metrics.increment('llm_tokens_total', usage.prompt_token_count or 0, agent=callback_context.agent_name, type='prompt')
+        metrics.increment('llm_tokens_total', usage.candidates_token_count or 0, agent=callback_context.agent_name, type='completion')
+    elapsed = _end_span(key, 'llm_call_duration_seconds', agent=callback_context.agent_name)
+    logging.info(f'Model call for agent {callback_context.agent_name} completed in {elapsed:.2f}s')
+
 async def logger_on_model_error_callback(callbackContext:CallbackContext, llm_request: LlmRequest, exception:Exception):
+    _end_span(('model', callbackContext.invocation_id, callbackContext.agent_name), 'llm_call_duration_seconds',
+              agent=callbackContext.agent_name)
+    metrics.increment('llm_errors_total', agent=callbackContext.agent_name)
     logging.error(f"Exception {exception} occurred during llm-request {llm_request.contents} that is being executed by agent {callbackContext.agent_name} for session {callbackContext.session.id} and invocation {callbackContext.invocation_id}")
 
+async def _resolve_file_part(part: Part) -> list[Part]:
+    uri = part.file_data.file_uri
+    if part.file_data.mime_type != FRAME_SET_MIME_TYPE:
+        return [Part(inline_data=Blob(mime_type=part.file_data.mime_type, data=await media_store.read_bytes(uri)))]
+
+    frame_set = await asyncio.to_thread(load_frame_set, uri)
+    if 'start' in frame_set:
+        # One segment of a long video; frame timestamps stay relative to the start of the whole video
+        heading = f"{len(frame_set['frames'])} keyframes sampled from {frame_set['start']}s to {frame_set['end']}s of a video:"
+    else:
+        heading = f"{len(frame_set['frames'])} keyframes sampled from a {frame_set['duration']}s video:"
+    parts = [Part(text=heading)]
+    for frame in frame_set['frames']:
+        parts.append(Part(text=f"Frame at {frame['timestamp']}s"))
+        parts.append(Part(inline_data=Blob(mime_type=frame['mime_type'], data=await media_store.read_bytes(frame['uri']))))
+    return parts
+
+async def resolve_file_uri_before_model_callback(callback_context: CallbackContext, llm_request: LlmRequest):
+    # Media arrives as file:// references; load the bytes only for the model request, never into the session
+    for content in llm_request.contents:
+        parts = []
+        for part in content.parts or []:
+            if part.file_data and part.file_data.file_uri and part.file_data.file_uri.startswith('file://'):
+                logging.info(f"Agent {callback_context.agent_name} loading media {part.file_data.file_uri}")
+                parts.extend(await _resolve_file_part(part))
+            else:
+                parts.append(part)
+        content.parts = parts
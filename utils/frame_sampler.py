@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import cv2
+
+from utils.media_store import MediaRef, media_store
+
+FRAME_SET_MIME_TYPE = "application/vnd.frame-set+json"
+
+
+class FrameSampler:
+    """Decodes a video once into a compact, timestamped keyframe set shared by all hazard agents."""
+
+    def __init__(self,
+                 root_dir: str = os.getenv("ARTIFACT_DIR", "artifacts"),
+                 interval: float = float(os.getenv("FRAME_INTERVAL_SECONDS", "2.0")),
+                 probe_interval: float = float(os.getenv("FRAME_PROBE_INTERVAL_SECONDS", "0.5")),
+                 scene_threshold: float = float(os.getenv("FRAME_SCENE_THRESHOLD", "0.3")),
+                 max_frames: int = int(os.getenv("FRAME_MAX_COUNT", "24")),
+                 max_width: int = int(os.getenv("FRAME_MAX_WIDTH", "768")),
+                 jpeg_quality: int = int(os.getenv("FRAME_JPEG_QUALITY", "80"))):
+        self.frame_dir = Path(root_dir).expanduser().resolve() / "frames"
+        self.interval = interval
+        self.probe_interval = probe_interval
+        self.scene_threshold = scene_threshold
+        self.max_frames = max_frames
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+
+    def cache_key(self, sha256: str, start: float = 0.0, end: Optional[float] = None) -> str:
+        """Frame-set directory name for a video and window under this sampler's parameters."""
+        # Changing any sampling parameter or the window produces a new frame set instead of reusing a stale one
+        params = f"{self.interval}:{self.probe_interval}:{self.scene_threshold}:{self.max_frames}:{self.max_width}:{self.jpeg_quality}"
+        if start or end is not None:
+            params += f":{start}:{end}"
+        return f"{sha256}-{hashlib.sha256(params.encode()).hexdigest()[:8]}"
+
+    @staticmethod
+    def _histogram(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        histogram = cv2.calcHist([gray], [0], None, [64], [0, 256])
+        return cv2.normalize(histogram, histogram)
+
+    def _downscale(self, frame):
+        height, width = frame.shape[:2]
+        if width <= self.max_width:
+            return frame
+        scale = self.max_width / width
+        return cv2.resize(frame, (self.max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    def sample_sync(self, media: MediaRef, start: float = 0.0, end: Optional[float] = None) -> MediaRef:
+        """Samples the whole video, or only [start, end) seconds of it; timestamps stay relative to the video start.
+
+        Blocking: decodes in the calling thread, so async callers run it with asyncio.to_thread.
+        """
+        target_dir = self.frame_dir / self.cache_key(media.sha256, start, end)
+        manifest_path = target_dir / "manifest.json"
+        if manifest_path.exists():
+            logging.info(f"Reusing cached frame set for {media.sha256}")
+            return MediaRef(sha256=media.sha256, uri=manifest_path.as_uri(), mime_type=FRAME_SET_MIME_TYPE,
+                            size=manifest_path.stat().st_size)
+
+        capture = cv2.VideoCapture(str(media_store.resolve(media.uri)))
+        if not capture.isOpened():
+            logging.warning(f"Unable to decode {media.uri}, sending the original media")
+            return media
+
+        target_dir.mkdir(parents=True, exist_ok=True)
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        stride = max(1, round(fps * self.probe_interval))
+        frames = []
+        last_histogram = None
+        last_timestamp = None
+        index = 0
+        if start:
+            capture.set(cv2.CAP_PROP_POS_MSEC, start * 1000)
+            index = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+        first_index = index
+        try:
+            while (end is None or index / fps < end) and capture.grab():
+                if index % stride == 0:
+                    ok, frame = capture.retrieve()
+                    if not ok:
+                        break
+                    timestamp = index / fps
+                    histogram = self._histogram(frame)
+                    scene_changed = last_histogram is not None and cv2.compareHist(
+                        last_histogram, histogram, cv2.HISTCMP_BHATTACHARYYA) > self.scene_threshold
+                    interval_elapsed = last_timestamp is None or timestamp - last_timestamp >= self.interval
+                    if scene_changed or interval_elapsed:
+                        frame_path = target_dir / f"{len(frames):05d}.jpg"
+                        cv2.imwrite(str(frame_path), self._downscale(frame),
+                                    [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                        frames.append({"uri": frame_path.as_uri(), "mime_type": "image/jpeg",
+                                       "timestamp": round(timestamp, 2)})
+                        last_histogram = histogram
+                        last_timestamp = timestamp
+                index += 1
+        finally:
+            capture.release()
+
+        if not frames:
+            logging.warning(f"No frames decoded from {media.uri}, sending the original media")
+            return media
+
+        if len(frames) > self.max_frames:
+            # Keep an even spread over the whole clip and drop the rest from disk
+            step = len(frames) / self.max_frames
+            keep = {int(i * step) for i in range(self.max_frames)}
+            for position, frame in enumerate(frames):
+                if position not in keep:
+                    media_store.resolve(frame["uri"]).unlink(missing_ok=True)
+            frames = [frame for position, frame in enumerate(frames) if position in keep]
+
+        manifest = {
+            "source_sha256": media.sha256,
+            "source_uri": media.uri,
+            "source_mime_type": media.mime_type,
+            "duration": round(index / fps, 2),
+            "frames": frames,
+        }
+        if start or end is not None:
+            manifest["start"] = round(first_index / fps, 2)
+            manifest["end"] = round(index / fps, 2)
+            manifest["duration"] = round((index - first_index) / fps, 2)
+        manifest_path.write_text(json.dumps(manifest))
+        logging.info(f"Sampled {len(frames)} frames from {index - first_index} decoded frames of {media.sha256}")
+        return MediaRef(sha256=media.sha256, uri=manifest_path.as_uri(), mime_type=FRAME_SET_MIME_TYPE,
+                        size=manifest_path.stat().st_size)
+
+    async def sample(self, media: MediaRef) -> MediaRef:
+        """Returns a frame-set reference for videos; other media is returned unchanged."""
+        if not (media.mime_type or "").startswith("video/"):
+            return media
+        return await asyncio.to_thread(self.sample_sync, media)
+
+
+def load_frame_set(uri: str) -> dict:
+    with open(media_store.resolve(uri)) as manifest:
+        return json.load(manifest)
+
+
+frame_sampler = FrameSampler()
@@ -0,0 +1,111 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class Severity(str, Enum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    CRITICAL = "critical"
+
+
+SEVERITY_RANK = {Severity.CRITICAL: 0, Severity.HIGH: 1, Severity.MEDIUM: 2, Severity.LOW: 3}
+
+
+class HazardFinding(BaseModel):
+    category: str = Field(description="Hazard category, e.g. fire, electrical, ppe")
+    description: str = Field(description="What the hazard is and where it is visible")
+    severity: Severity
+    timestamp: Optional[float] = Field(default=None, description="Seconds from the start of the video")
+    recommendation: Optional[str] = Field(default=None, description="How to control the hazard")
+
+
+class HazardReport(BaseModel):
+    """Output schema of a hazard agent; travels to the root agent as an A2A DataPart."""
+    agent: str = Field(description="Name of the hazard agent that produced the report")
+    findings: list[HazardFinding] = Field(default_factory=list)
+    summary: str = Field(default="", description="One or two sentences on the overall risk")
+
+
+class MultiHazardReport(BaseModel):
+    """Output schema of the combined multi-hazard agent: one report per requested category."""
+    reports: list[HazardReport]
+
+
+def merge_segment_reports(agent_name: str, segments: list[tuple[dict, dict]], window: float) -> dict:
+    """Reduces one agent's reports on the segments of a long video, given as (segment, report) pairs, to one report.
+
+    Findings of the same category less than window seconds apart are one event seen from two overlapping
+    segments; the more severe one is kept. Findings without a timestamp are placed at their segment's start.
+    Segments the agent failed on are listed in the summary; the report is an error only if every segment failed.
+    """
+    findings: list[HazardFinding] = []
+    summaries = []
+    failed = []
+    for segment, result in sorted(segments, key=lambda pair: pair[0]['start']):
+        if 'error' in result:
+            failed.append(segment)
+            continue
+        report = HazardReport.model_validate(result)
+        for finding in report.findings:
+            findings.append(finding if finding.timestamp is not None
+                            else finding.model_copy(update={'timestamp': segment['start']}))
+        if report.findings and report.summary:
+            summaries.append(f"[{segment['start']}s-{segment['end']}s] {report.summary}")
+    if segments and len(failed) == len(segments):
+        return {"error": f"Every segment failed, last error: {segments[-1][1]['error']}"}
+
+    events: list[HazardFinding] = []
+    for finding in sorted(findings, key=lambda f: (f.category.lower(), f.timestamp, SEVERITY_RANK[f.severity])):
+        previous = events[-1] if events else None
+        if (previous is not None and previous.category.lower() == finding.category.lower()
+                and finding.timestamp - previous.timestamp < window):
+            if SEVERITY_RANK[finding.severity] < SEVERITY_RANK[previous.severity]:
+                events[-1] = finding.model_copy(update={'timestamp': previous.timestamp})
+            continue
+        events.append(finding)
+    if failed:
+        summaries.append("Not analysed: " + ", ".join(f"{s['start']}s-{s['end']}s" for s in failed))
+    return HazardReport(agent=agent_name, findings=events, summary=" ".join(summaries)).model_dump(
+        mode='json', exclude_none=True)
+
+
+def merge_reports(reports: dict[str, dict], timeline: bool = False) -> dict:
+    """Deterministically merges per-agent reports (or {'error': ...} entries) into findings grouped by category.
+
+    Duplicate findings reported by several agents are kept once, and each category is ordered by severity,
+    then timestamp, so identical inputs always produce identical consolidation prompts. With timeline, the
+    findings of every category are instead listed together in time order, as long recordings are read.
+    """
+    categories: dict[str, list[dict]] = {}
+    seen = set()
+    failed = {}
+    for agent_name in sorted(reports):
+        result = reports[agent_name]
+        if 'error' in result:
+            failed[agent_name] = result['error']
+            continue
+        for finding in HazardReport.model_validate(result).findings:
+            key = (finding.category.lower(), finding.description.strip().lower(), finding.timestamp)
+            if key in seen:
+                continue
+            seen.add(key)
+            categories.setdefault(finding.category.lower(), []).append(
+                finding.model_dump(mode='json', exclude_none=True, exclude={'category'}) | {'agent': agent_name})
+
+    for findings in categories.values():
+        findings.sort(key=lambda f: (SEVERITY_RANK[Severity(f['severity'])],
+                                     f.get('timestamp', float('inf')), f['description']))
+    if timeline:
+        grouped = {"timeline": sorted(
+            ({'category': category} | finding for category, findings in categories.items() for finding in findings),
+            key=lambda f: (f.get('timestamp', float('inf')), SEVERITY_RANK[Severity(f['severity'])], f['category']))}
+    else:
+        grouped = {"categories": dict(sorted(categories.items()))}
+    return grouped | {
+        "summaries": {name: reports[name].get('summary', '') for name in sorted(reports)
+                      if name not in failed and reports[name].get('summary')},
+        "failed_agents": failed,
+    }
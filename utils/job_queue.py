@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    payload: dict
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    events: list[dict] = field(default_factory=list)
+    subscribers: list[asyncio.Queue] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Bounded queue of analysis jobs drained by a fixed pool of background workers."""
+
+    def __init__(self,
+                 handler: Callable[[Job], Awaitable[Any]],
+                 workers: int = int(os.getenv("JOB_WORKERS", "4")),
+                 max_queue: int = int(os.getenv("JOB_QUEUE_SIZE", "100")),
+                 retention: float = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))):
+        self.handler = handler
+        self.workers = workers
+        self.retention = retention
+        self.jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queue)
+        self._tasks: list[asyncio.Task] = []
+        self._running = 0
+        self._reserved = 0
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logging.info(f"Started {self.workers} job workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, **payload) -> Job:
+        """Queues a job and returns it immediately; raises asyncio.QueueFull when the queue is at capacity."""
+        if self.full():
+            raise asyncio.QueueFull
+        return self._put(payload)
+
+    @contextmanager
+    def reserve(self) -> Iterator[Callable[..., Job]]:
+        """Holds a queue slot while the caller prepares the job and yields the function that submits into it.
+
+        Raises asyncio.QueueFull up front, so a caller can refuse before consuming its input; the slot is
+        released if the block exits without submitting.
+        """
+        if self.full():
+            raise asyncio.QueueFull
+        self._reserved += 1
+        submitted = False
+
+        def submit(**payload) -> Job:
+            nonlocal submitted
+            if submitted:
+                raise RuntimeError("A reserved slot takes one job")
+            submitted = True
+            self._reserved -= 1
+            return self._put(payload)
+
+        try:
+            yield submit
+        finally:
+            if not submitted:
+                self._reserved -= 1
+
+    def _put(self, payload: dict) -> Job:
+        self._prune()
+        job = Job(id=str(uuid.uuid4()), payload=payload)
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self.publish(job, "status", {"status": job.status.value})
+        return job
+
+    def full(self) -> bool:
+        return self._queue.qsize() + self._reserved >= self._queue.maxsize
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "reserved": self._reserved, "running": self._running,
+                "workers": self.workers, "capacity": self._queue.maxsize}
+
+    def publish(self, job: Job, event: str, data: Any):
+        message = {"event": event, "data": data}
+        job.events.append(message)
+        for subscriber in job.subscribers:
+            subscriber.put_nowait(message)
+
+    async def subscribe(self, job: Job) -> AsyncIterator[dict]:
+        """Replays the job's events so far and then follows new ones until the job finishes."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for message in job.events:
+            queue.put_nowait(message)
+        if job.done:
+            while not queue.empty():
+                yield queue.get_nowait()
+            return
+
+        job.subscribers.append(queue)
+        try:
+            while True:
+                message = await queue.get()
+                yield message
+                if message["event"] == "status" and message["data"]["status"] in (
+                        JobStatus.SUCCEEDED.value, JobStatus.FAILED.value):
+                    return
+        finally:
+            job.subscribers.remove(queue)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self.jobs.items()):
+            if job.done and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            self.publish(job, "status", {"status": job.status.value})
+            try:
+                job.result = await self.handler(job)
+                job.status = JobStatus.SUCCEEDED
+            except Exception as e:
+                logging.error(f"Job {job.id} failed on worker {index}: {type(e).__name__}: {e}", exc_info=True)
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = JobStatus.FAILED
+            finally:
+                job.finished_at = time.time()
+                self._running -= 1
+                self._queue.task_done()
+            if job.status == JobStatus.SUCCEEDED:
+                self.publish(job, "result", job.result)
+            self.publish(job, "status", {"status": job.status.value, "error": job.error})
@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import AsyncGenerator, Optional
+
+import litellm
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.lite_llm import LiteLlm
+
+from utils.telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+# Set by whoever starts the work: uploads waiting on a response are interactive, queued jobs are batch
+llm_priority: ContextVar[Priority] = ContextVar('llm_priority', default=Priority.INTERACTIVE)
+
+
+class LlmLimiter:
+    """Shared gate in front of the model: a token bucket on the request rate plus an AIMD concurrency limit.
+
+    Waiting calls are granted in priority order, FIFO within a priority. The limit grows by one per window
+    of successful calls and halves on overload (429, timeouts, 5xx, or latency above the target), so under a
+    burst the model runs at the concurrency it can sustain instead of timing every request out.
+    """
+
+    def __init__(self,
+                 rate: float = float(os.getenv('LLM_RATE_PER_SECOND', '0')),
+                 burst: int = int(os.getenv('LLM_BURST', '10')),
+                 initial_limit: int = int(os.getenv('LLM_INITIAL_CONCURRENCY', '16')),
+                 min_limit: int = int(os.getenv('LLM_MIN_CONCURRENCY', '1')),
+                 max_limit: int = int(os.getenv('LLM_MAX_CONCURRENCY', '64')),
+                 latency_target: float = float(os.getenv('LLM_LATENCY_TARGET_SECONDS', '0'))):
+        self.rate = rate
+        self.burst = burst
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def load(self) -> int:
+        """Model calls running or waiting, the load agent replicas report to the registry."""
+        return self.in_flight + len(self._waiters)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self._dispatch()
+        start = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted in the same tick as the cancellation: hand the slot on
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+        metrics.observe('llm_queue_wait_seconds', time.monotonic() - start, priority=priority.name.lower())
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False, retry_after: Optional[float] = None):
+        """Returns a slot; latency is None when the call failed for reasons that say nothing about load."""
+        self.in_flight -= 1
+        now = time.monotonic()
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        if overloaded or (self.latency_target and latency is not None and latency > self.latency_target):
+            # Halve at most once per call duration, so one burst of failures is one decrease
+            if now - self._last_decrease >= (latency or 1.0):
+                self.limit = max(float(self.min_limit), self.limit / 2)
+                self._last_decrease = now
+                logger.warning(f"LLM overloaded, concurrency limit lowered to {int(self.limit)}")
+        elif latency is not None:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        metrics.observe('llm_concurrency_limit', self.limit)
+        self._dispatch()
+
+    def _dispatch(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+        delay = None
+        while self._waiters and self.in_flight < int(self.limit):
+            if now < self._blocked_until:
+                delay = self._blocked_until - now
+                break
+            if self.rate > 0 and self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                break
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if self.rate > 0:
+                self._tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+        if delay is not None and self._wakeup is None:
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self):
+        self._wakeup = None
+        self._dispatch()
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    # litellm keeps the provider's headers on the exception; its response object may be synthetic
+    headers = getattr(error, 'litellm_response_headers', None)
+    if headers is None:
+        response = getattr(error, 'response', None)
+        headers = response.headers if response is not None else {}
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# One limiter per process, shared by every agent's model calls
+llm_limiter = LlmLimiter()
+
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+
+
+class RateLimitedLiteLlm(LiteLlm):
+    """LiteLlm whose calls pass through the process-wide limiter; 429s are retried after the server's Retry-After."""
+
+    def __init__(self, model: str, **kwargs):
+        # Retries happen here, where the limiter sees the 429s, not hidden inside the provider client
+        kwargs.setdefault('max_retries', 0)
+        super().__init__(model=model, **kwargs)
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await llm_limiter.acquire(llm_priority.get())
+            start = time.monotonic()
+            try:
+                async for response in super().generate_content_async(llm_request, stream):
+                    yield response
+            except litellm.RateLimitError as e:
+                retry_after = _retry_after(e)
+                llm_limiter.release(overloaded=True, retry_after=retry_after)
+                metrics.increment('llm_rate_limited_total')
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                logger.warning(f"LLM rate limited, retrying after {retry_after or 0:.1f}s "
+                               f"(attempt {attempt + 1} of {LLM_MAX_RETRIES})")
+            except (litellm.Timeout, litellm.ServiceUnavailableError, litellm.InternalServerError):
+                llm_limiter.release(overloaded=True)
+                raise
+            except BaseException:
+                llm_limiter.release()
+                raise
+            else:
+                llm_limiter.release(time.monotonic() - start)
+                return
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import random
+from typing import Any, Optional
+
+import anyio
+import mcp.types
+from mcp import ClientSession, McpError
+from mcp.client.sse import sse_client
+
+logger = logging.getLogger(__name__)
+
+
+class McpSession:
+    """One long-lived MCP client session with reconnect backoff and a cached name -> tool map."""
+
+    def __init__(self,
+                 url: str = os.getenv('MCP_SERVER_URL', 'http://localhost:8181/sse'),
+                 timeout: float = float(os.getenv('MCP_TIMEOUT_SECONDS', '30')),
+                 ping_interval: float = float(os.getenv('MCP_PING_INTERVAL_SECONDS', '30')),
+                 max_backoff: float = float(os.getenv('MCP_MAX_BACKOFF_SECONDS', '30'))):
+        self.url = url
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.max_backoff = max_backoff
+        self.tools: dict[str, mcp.types.Tool] = {}
+        self._session: Optional[ClientSession] = None
+        self._ready = asyncio.Event()
+        self._broken = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "McpSession":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        # The SSE transport's cancel scopes must be entered and exited in one task, so the session lives here
+        attempt = 0
+        while True:
+            try:
+                async with sse_client(self.url, timeout=self.timeout) as (read_stream, write_stream):
+                    async with ClientSession(read_stream, write_stream, message_handler=self._on_message) as session:
+                        await session.initialize()
+                        self._session = session
+                        await self.refresh_tools()
+                        self._broken.clear()
+                        self._ready.set()
+                        attempt = 0
+                        logger.info(f"MCP session connected to {self.url} with tools {sorted(self.tools)}")
+                        await self._keepalive(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP session to {self.url} lost: {type(e).__name__}: {e}")
+            finally:
+                self._ready.clear()
+                self._session = None
+            # Exponential backoff with jitter so replicas do not reconnect in lockstep
+            delay = min(self.max_backoff, 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            logger.info(f"Reconnecting to MCP server in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _keepalive(self, session: ClientSession):
+        while True:
+            try:
+                await asyncio.wait_for(self._broken.wait(), timeout=self.ping_interval)
+                raise ConnectionError("call on the session failed")
+            except asyncio.TimeoutError:
+                await asyncio.wait_for(session.send_ping(), timeout=self.timeout)
+
+    async def _on_message(self, message: Any):
+        if isinstance(message, mcp.types.ServerNotification) and \
+                isinstance(message.root, mcp.types.ToolListChangedNotification):
+            # Refresh outside the receive loop: awaiting a response from inside it would deadlock
+            self._refresh_task = asyncio.create_task(self.refresh_tools())
+
+    async def refresh_tools(self):
+        if self._session is None:
+            return
+        result = await self._session.list_tools()
+        self.tools = {tool.name: tool for tool in result.tools}
+        logger.info(f"MCP tool list refreshed: {sorted(self.tools)}")
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None) -> mcp.types.CallToolResult:
+        """Calls a tool on the shared session, waiting up to the timeout for a (re)connection."""
+        await asyncio.wait_for(self._ready.wait(), timeout=self.timeout)
+        if name not in self.tools:
+            raise KeyError(f"MCP tool '{name}' not found. Available tools: {sorted(self.tools)}")
+        try:
+            return await self._session.call_tool(name, arguments or {})
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            # The request never left this process, so it is safe to send again once reconnected
+            self._mark_broken()
+            await asyncio.wait_for(self._ready.wait(), timeout=self.timeout)
+            return await self._session.call_tool(name, arguments or {})
+        except McpError:
+            raise
+        except Exception:
+            self._mark_broken()
+            raise
+
+    def _mark_broken(self):
+        # Stop handing out the session now; the run loop reconnects
+        self._ready.clear()
+        self._broken.set()
+
+def tool_text(result: mcp.types.CallToolResult) -> str:
+    """Text of the first content block, which is where FastMCP puts a tool's return value."""
+    return result.content[0].text if result.content else ""
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+from dataclasses import dataclass, replace
+from enum import Enum
+from pathlib import Path
+
+import cv2
+
+from utils.frame_sampler import FRAME_SET_MIME_TYPE, FrameSampler, frame_sampler, load_frame_set
+from utils.media_store import MediaRef, media_store
+from utils.telemetry import metrics
+from utils.video_segmenter import SEGMENT_SET_MIME_TYPE, VideoSegmenter, load_segment_set, video_segmenter
+
+# Rough size of a JPEG at the configured quality, used to turn a byte budget into a frame resolution
+JPEG_BYTES_PER_PIXEL = 0.15
+
+
+class MediaKind(str, Enum):
+    IMAGE = "image"
+    SHORT_CLIP = "short_clip"
+    LONG_VIDEO = "long_video"
+    OTHER = "other"
+
+
+@dataclass(frozen=True)
+class MediaProbe:
+    kind: MediaKind
+    width: int = 0
+    height: int = 0
+    duration: float = 0.0
+
+
+class MediaNormalizer:
+    """Routes uploads by type and shrinks them to a payload budget before any agent sees them.
+
+    Images become one downscaled JPEG. Short clips are sampled at SHORT_CLIP_FPS, long videos spread their
+    frames over the whole duration, and in both cases the frame width is chosen so the frame set fits
+    MEDIA_PAYLOAD_BUDGET_BYTES. Videos longer than one segment are split into overlapping segments instead,
+    each with its own budget. Results are stored per content hash and parameters, so repeats are free.
+    """
+
+    def __init__(self,
+                 root_dir: str = os.getenv("ARTIFACT_DIR", "artifacts"),
+                 short_clip_seconds: float = float(os.getenv("SHORT_CLIP_SECONDS", "20")),
+                 short_clip_fps: float = float(os.getenv("SHORT_CLIP_FPS", "1.0")),
+                 payload_budget: int = int(os.getenv("MEDIA_PAYLOAD_BUDGET_BYTES", "2000000")),
+                 max_side: int = int(os.getenv("MEDIA_MAX_SIDE", "1024")),
+                 min_width: int = int(os.getenv("MEDIA_MIN_WIDTH", "320")),
+                 sampler: FrameSampler = frame_sampler,
+                 segmenter: VideoSegmenter = video_segmenter):
+        self.root_dir = root_dir
+        self.image_dir = Path(root_dir).expanduser().resolve() / "normalized"
+        self.short_clip_seconds = short_clip_seconds
+        self.short_clip_fps = short_clip_fps
+        self.payload_budget = payload_budget
+        self.max_side = max_side
+        self.min_width = min_width
+        self.sampler = sampler
+        self.segmenter = segmenter
+
+    def probe(self, media: MediaRef) -> MediaProbe:
+        mime_type = media.mime_type or ""
+        if mime_type.startswith("image/"):
+            return MediaProbe(kind=MediaKind.IMAGE)
+        if not mime_type.startswith("video/"):
+            return MediaProbe(kind=MediaKind.OTHER)
+
+        capture = cv2.VideoCapture(str(media_store.resolve(media.uri)))
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+            frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+            width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        finally:
+            capture.release()
+        # Streams that do not report a frame count are treated as long, the cheaper assumption
+        duration = frame_count / fps if frame_count > 0 else math.inf
+        kind = MediaKind.SHORT_CLIP if duration <= self.short_clip_seconds else MediaKind.LONG_VIDEO
+        return MediaProbe(kind=kind, width=width, height=height, duration=duration)
+
+    def _scale(self, width: int, height: int, pixel_budget: float) -> float:
+        """Scale factor that fits the longest side and the pixel budget, never upscaling or going below min_width."""
+        scale = min(1.0, self.max_side / max(width, height), math.sqrt(pixel_budget / (width * height)))
+        return max(scale, min(1.0, self.min_width / width))
+
+    def _normalize_image_sync(self, media: MediaRef) -> MediaRef:
+        params = f"{self.max_side}:{self.min_width}:{self.payload_budget}:{self.sampler.jpeg_quality}"
+        target = self.image_dir / f"{media.sha256}-{hashlib.sha256(params.encode()).hexdigest()[:8]}.jpg"
+        if target.exists():
+            return MediaRef(sha256=media.sha256, uri=target.as_uri(), mime_type="image/jpeg",
+                            size=target.stat().st_size)
+
+        image = cv2.imread(str(media_store.resolve(media.uri)), cv2.IMREAD_COLOR)
+        if image is None:
+            logging.warning(f"Unable to decode image {media.uri}, sending the original media")
+            return media
+        height, width = image.shape[:2]
+        scale = self._scale(width, height, self.payload_budget / JPEG_BYTES_PER_PIXEL)
+        if scale >= 1.0 and media.mime_type == "image/jpeg" and media.size <= self.payload_budget:
+            return media
+        if scale < 1.0:
+            image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix(".partial.jpg")
+        cv2.imwrite(str(partial), image, [cv2.IMWRITE_JPEG_QUALITY, self.sampler.jpeg_quality])
+        os.replace(partial, target)
+        return MediaRef(sha256=media.sha256, uri=target.as_uri(), mime_type="image/jpeg", size=target.stat().st_size)
+
+    def _video_sampler(self, probe: MediaProbe) -> FrameSampler:
+        """A frame sampler whose rate and resolution fit the payload budget for this video."""
+        if probe.kind == MediaKind.SHORT_CLIP:
+            interval = 1 / self.short_clip_fps
+            frames = min(self.sampler.max_frames, max(1, math.ceil(probe.duration * self.short_clip_fps)))
+        else:
+            frames = self.sampler.max_frames
+            interval = self.sampler.interval if math.isinf(probe.duration) else \
+                max(self.sampler.interval, probe.duration / frames)
+
+        max_width = self.sampler.max_width
+        if probe.width and probe.height:
+            scale = self._scale(probe.width, probe.height, self.payload_budget / frames / JPEG_BYTES_PER_PIXEL)
+            max_width = int(probe.width * scale)
+        return FrameSampler(root_dir=self.root_dir,
+                            interval=interval,
+                            probe_interval=min(self.sampler.probe_interval, interval),
+                            scene_threshold=self.sampler.scene_threshold,
+                            max_frames=frames,
+                            max_width=max_width,
+                            jpeg_quality=self.sampler.jpeg_quality)
+
+    @staticmethod
+    def _payload_bytes(media: MediaRef) -> int:
+        """Bytes the agents will receive: every frame of a frame or segment set, otherwise the file itself."""
+        if media.mime_type == SEGMENT_SET_MIME_TYPE:
+            frame_sets = [segment["uri"] for segment in load_segment_set(media.uri)["segments"]]
+        elif media.mime_type == FRAME_SET_MIME_TYPE:
+            frame_sets = [media.uri]
+        else:
+            return media.size
+        return sum(media_store.resolve(frame["uri"]).stat().st_size
+                   for uri in frame_sets for frame in load_frame_set(uri)["frames"])
+
+    def _normalize_sync(self, media: MediaRef, probe: MediaProbe) -> MediaRef:
+        if probe.kind == MediaKind.IMAGE:
+            return self._normalize_image_sync(media)
+        if probe.kind in (MediaKind.SHORT_CLIP, MediaKind.LONG_VIDEO):
+            return self._video_sampler(probe).sample_sync(media)
+        return media
+
+    def _segmented(self, probe: MediaProbe) -> bool:
+        return probe.kind == MediaKind.LONG_VIDEO and self.segmenter.segment_seconds < probe.duration < math.inf
+
+    async def normalize(self, media: MediaRef) -> MediaRef:
+        """Image -> one downscaled JPEG, video -> budgeted frame set or segment set, anything else unchanged."""
+        probe = await asyncio.to_thread(self.probe, media)
+        if self._segmented(probe):
+            # Every segment is analysed by its own agent calls, so the payload budget applies per segment
+            sampler = self._video_sampler(replace(probe, duration=self.segmenter.segment_seconds))
+            normalized = await self.segmenter.segment(media, probe.duration, sampler)
+        else:
+            normalized = await asyncio.to_thread(self._normalize_sync, media, probe)
+        payload = await asyncio.to_thread(self._payload_bytes, normalized)
+        metrics.observe('media_payload_bytes', payload, kind=probe.kind.value)
+        logging.info(f"Normalized {probe.kind.value} {media.sha256} from {media.size} to {payload} bytes")
+        return normalized
+
+
+media_normalizer = MediaNormalizer()
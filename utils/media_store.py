@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from urllib.parse import unquote, urlparse
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class MediaRef:
+    sha256: str
+    uri: str
+    mime_type: str
+    size: int
+
+
+@dataclass
+class _PendingUpload:
+    path: Path
+    offset: int
+    # Lost on restart; the hash is then recomputed from disk when the upload completes
+    digest: Optional["hashlib._Hash"]
+    # Serialises PUTs and completion of the same upload
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class MediaStore:
+    """Content-addressed store for uploaded media, shared with the agents by file:// URI.
+
+    Resumable uploads not written to for UPLOAD_TTL_SECONDS are abandoned: a periodic sweep deletes their
+    partial files, and resuming them afterwards returns unknown upload.
+    """
+
+    def __init__(self,
+                 root_dir: str = os.getenv("ARTIFACT_DIR", "artifacts"),
+                 upload_ttl: float = float(os.getenv("UPLOAD_TTL_SECONDS", "86400")),
+                 sweep_interval: float = float(os.getenv("UPLOAD_SWEEP_INTERVAL_SECONDS", "600"))):
+        self.root = Path(root_dir).expanduser().resolve()
+        self.blob_dir = self.root / "blobs"
+        self.upload_dir = self.root / "uploads"
+        self.upload_ttl = upload_ttl
+        self.sweep_interval = sweep_interval
+        self._uploads: dict[str, _PendingUpload] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def blob_path(self, sha256: str, mime_type: str) -> Path:
+        extension = mimetypes.guess_extension(mime_type or "") or ""
+        return self.blob_dir / f"{sha256}{extension}"
+
+    @staticmethod
+    def _hash_file_sync(path: Path) -> tuple[str, int]:
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as source:
+            while chunk := source.read(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def _commit_sync(self, path: Path, sha256: str, size: int, mime_type: str) -> MediaRef:
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        target = self.blob_path(sha256, mime_type)
+        if target.exists():
+            logging.info(f"Media {sha256} already stored, dropping duplicate {path}")
+            os.remove(path)
+        else:
+            shutil.move(path, target)
+        return MediaRef(sha256=sha256, uri=target.as_uri(), mime_type=mime_type, size=size)
+
+    def _put_file_sync(self, path: str, mime_type: str) -> MediaRef:
+        sha256, size = self._hash_file_sync(Path(path))
+        return self._commit_sync(Path(path), sha256, size, mime_type)
+
+    async def put_file(self, path: str, mime_type: str) -> MediaRef:
+        """Moves a file into the store under its SHA-256 and returns its reference."""
+        return await asyncio.to_thread(self._put_file_sync, path, mime_type)
+
+    def _add_file_sync(self, path: str, mime_type: str) -> MediaRef:
+        sha256, size = self._hash_file_sync(Path(path))
+        target = self.blob_path(sha256, mime_type)
+        if not target.exists():
+            self.blob_dir.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(f"{target.name}.{uuid.uuid4().hex}.part")
+            try:
+                os.link(path, partial)
+            except OSError:
+                # Different filesystem: fall back to a copy
+                shutil.copyfile(path, partial)
+            os.replace(partial, target)
+        return MediaRef(sha256=sha256, uri=target.as_uri(), mime_type=mime_type, size=size)
+
+    async def add_file(self, path: str, mime_type: str) -> MediaRef:
+        """Like put_file, but leaves the original in place: the blob is a hard link to it, or a copy."""
+        return await asyncio.to_thread(self._add_file_sync, path, mime_type)
+
+    def _pending_upload(self, upload_id: str) -> _PendingUpload:
+        upload = self._uploads.get(upload_id)
+        if upload is None:
+            try:
+                path = self.upload_dir / f"{uuid.UUID(upload_id)}.part"
+            except ValueError:
+                raise FileNotFoundError(f"Unknown upload {upload_id}")
+            if not path.exists():
+                raise FileNotFoundError(f"Unknown upload {upload_id}")
+            upload = _PendingUpload(path=path, offset=path.stat().st_size, digest=None)
+            self._uploads[upload_id] = upload
+        return upload
+
+    @asynccontextmanager
+    async def _locked_upload(self, upload_id: str) -> AsyncIterator[_PendingUpload]:
+        upload = self._pending_upload(upload_id)
+        async with upload.lock:
+            # Completed while this request was waiting for the lock
+            if self._uploads.get(upload_id) is not upload:
+                raise FileNotFoundError(f"Unknown upload {upload_id}")
+            yield upload
+
+    async def begin_upload(self) -> str:
+        """Starts a resumable upload and returns its id."""
+        upload_id = str(uuid.uuid4())
+        path = self.upload_dir / f"{upload_id}.part"
+        await asyncio.to_thread(self.upload_dir.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(path.touch)
+        self._uploads[upload_id] = _PendingUpload(path=path, offset=0, digest=hashlib.sha256())
+        return upload_id
+
+    def upload_offset(self, upload_id: str) -> int:
+        return self._pending_upload(upload_id).offset
+
+    async def append_chunks(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """Appends a streamed chunk at the given offset, hashing it as it is written; returns the new offset."""
+        async with self._locked_upload(upload_id) as upload:
+            if offset != upload.offset:
+                raise ValueError(f"Upload {upload_id} expects offset {upload.offset}, got {offset}")
+
+            target = await asyncio.to_thread(open, upload.path, "ab")
+            try:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    await asyncio.to_thread(target.write, chunk)
+                    if upload.digest is not None:
+                        upload.digest.update(chunk)
+                    upload.offset += len(chunk)
+            finally:
+                await asyncio.to_thread(target.close)
+            return upload.offset
+
+    async def complete_upload(self, upload_id: str, mime_type: str) -> MediaRef:
+        """Moves a finished upload into the store and returns its reference."""
+        async with self._locked_upload(upload_id) as upload:
+            if upload.digest is not None:
+                sha256, size = upload.digest.hexdigest(), upload.offset
+            else:
+                sha256, size = await asyncio.to_thread(self._hash_file_sync, upload.path)
+            media = await asyncio.to_thread(self._commit_sync, upload.path, sha256, size, mime_type)
+            self._uploads.pop(upload_id, None)
+            return media
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._expire_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _expire_periodically(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.expire_uploads()
+            except Exception as e:
+                logging.error(f"Upload expiry failed: {type(e).__name__}: {e}")
+
+    def _stale_uploads_sync(self, cutoff: float) -> list[Path]:
+        if not self.upload_dir.exists():
+            return []
+        return [path for path in self.upload_dir.glob("*.part") if path.stat().st_mtime < cutoff]
+
+    async def expire_uploads(self) -> int:
+        """Deletes uploads not written to for upload_ttl seconds; returns how many were removed."""
+        removed = 0
+        for path in await asyncio.to_thread(self._stale_uploads_sync, time.time() - self.upload_ttl):
+            upload_id = path.name.removesuffix(".part")
+            upload = self._uploads.get(upload_id)
+            if upload is not None:
+                if upload.lock.locked():
+                    continue
+                self._uploads.pop(upload_id)
+            await asyncio.to_thread(path.unlink, True)
+            removed += 1
+        if removed:
+            logging.info(f"Expired {removed} abandoned uploads")
+        return removed
+
+    async def ingest(self, chunks: AsyncIterator[bytes], mime_type: str) -> MediaRef:
+        """Streams chunks to disk while hashing them and returns the stored reference."""
+        upload_id = await self.begin_upload()
+        await self.append_chunks(upload_id, 0, chunks)
+        return await self.complete_upload(upload_id, mime_type)
+
+    def resolve(self, uri: str) -> Path:
+        """Path of a file:// URI; raises ValueError for anything outside the artifact directory."""
+        parsed = urlparse(uri)
+        if parsed.scheme not in ("file", ""):
+            raise ValueError(f"Unsupported media URI scheme: {uri}")
+        # A2A callers choose the URI, so it must not reach other files on the host
+        path = Path(unquote(parsed.path)).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Media URI outside the artifact directory: {uri}")
+        return path
+
+    def content_key_for_uri(self, uri: str) -> str:
+        """Returns the content address encoded in a blob URI or a frame-set manifest URI."""
+        path = self.resolve(uri)
+        if path.name == "manifest.json":
+            return path.parent.name
+        return path.name.split(".")[0]
+
+    async def read_bytes(self, uri: str) -> bytes:
+        return await asyncio.to_thread(self.resolve(uri).read_bytes)
+
+
+media_store = MediaStore()
@@ -1,27 +1,19 @@
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset,SseConnectionParams,McpToolsetConfig
+import os
+import sys
 
-async def tool_call():
-    # Define the SSE connection parameters
-    sse_params = SseConnectionParams(
-        url="http://localhost:8181/sse",  # URL of the MCP server supporting SSE
-        timeout=30  # Connection timeout in seconds
-    )
-
-    # Define the MCP configuration including the SSE connection parameters
-    mcp_config = McpToolsetConfig(
-        sse_connection_params=sse_params
-    )
+# Make the utils package importable when the script is run from this directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-    # Create the MCPToolset from the configuration
-    mcp_tool_set:McpToolset = McpToolset.from_config(config=mcp_config, config_abs_path="")
-    tools = await mcp_tool_set.get_tools()
+from utils.mcp_session import McpSession, tool_text
 
-    tool = [tool for tool in tools if tool.name == 'scan_and_register_agents'][0]
-    try:
-        agents = await tool.run_async(args={}, tool_context=None)
-        print(agents)
-    except Exception as e:
-        print(f"Error: {e}")
+async def tool_call():
+    # The session closes its SSE connection on exit instead of leaking it
+    async with McpSession() as session:
+        try:
+            result = await session.call_tool('scan_and_register_agents')
+            print(tool_text(result))
+        except Exception as e:
+            print(f"Error: {e}")
 
 
 if __name__ == "__main__":
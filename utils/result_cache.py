@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+class ResultCache:
+    """SQLite-backed LRU cache of agent results keyed by content hash, agent version and model."""
+
+    def __init__(self,
+                 path: str = os.getenv("RESULT_CACHE_PATH", os.path.join(os.getenv("ARTIFACT_DIR", "artifacts"), "result_cache.sqlite3")),
+                 max_entries: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000")),
+                 max_bytes: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+                 enabled: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content_key: str, agent_name: str, agent_version: str, model_id: str) -> str:
+        return hashlib.sha256(f"{content_key}|{agent_name}|{agent_version}|{model_id}".encode()).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)')
+        return self._conn
+
+    def _get_sync(self, cache_key: str) -> Optional[Any]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute('SELECT value FROM results WHERE cache_key = ?', (cache_key,)).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute('UPDATE results SET last_access = ? WHERE cache_key = ?', (time.time(), cache_key))
+            return json.loads(row[0])
+
+    def _put_sync(self, cache_key: str, value: Any):
+        payload = json.dumps(value)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('''
+                    INSERT INTO results (cache_key, value, size, last_access) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (cache_key) DO UPDATE SET value = excluded.value, size = excluded.size,
+                        last_access = excluded.last_access
+                ''', (cache_key, payload, len(payload), time.time()))
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk from least recently used and drop entries until both budgets are met
+        evicted = []
+        for cache_key, size in conn.execute('SELECT cache_key, size FROM results ORDER BY last_access'):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((cache_key,))
+            count -= 1
+            total -= size
+        conn.executemany('DELETE FROM results WHERE cache_key = ?', evicted)
+        logging.info(f"Result cache evicted {len(evicted)} entries")
+
+    async def get(self, cache_key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self._get_sync, cache_key)
+
+    async def put(self, cache_key: str, value: Any):
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self._put_sync, cache_key, value)
+
+
+result_cache = ResultCache()
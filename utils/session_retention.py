@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional
+
+from google.adk.events import Event
+from google.adk.memory import BaseMemoryService, InMemoryMemoryService
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.genai.types import FileData, Part
+
+from utils.media_store import media_store
+
+logger = logging.getLogger(__name__)
+
+
+async def _single_chunk(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+async def externalize_binary_parts(event: Event) -> Event:
+    """Moves inline bytes into the media store and leaves a file reference in their place.
+
+    The model still sees the bytes: resolve_file_uri_before_model_callback inlines file:// references per call.
+    """
+    if not event.content or not event.content.parts:
+        return event
+    for index, part in enumerate(event.content.parts):
+        if part.inline_data and part.inline_data.data:
+            media = await media_store.ingest(_single_chunk(part.inline_data.data),
+                                             part.inline_data.mime_type or "application/octet-stream")
+            event.content.parts[index] = Part(file_data=FileData(file_uri=media.uri, mime_type=media.mime_type))
+    return event
+
+
+class BoundedMemoryService(InMemoryMemoryService):
+    """InMemoryMemoryService that keeps text parts only and evicts whole sessions by age and count."""
+
+    def __init__(self,
+                 max_sessions: int = int(os.getenv('MEMORY_MAX_SESSIONS', '1000')),
+                 ttl: float = float(os.getenv('MEMORY_TTL_SECONDS', '604800'))):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # (user key, session id) -> time added, oldest first; re-adding a session moves it to the end
+        self._added: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    async def add_session_to_memory(self, session: Session):
+        text_events = []
+        for event in session.events:
+            parts = [Part(text=part.text) for part in (event.content.parts if event.content else []) or []
+                     if part.text]
+            if parts:
+                text_events.append(event.model_copy(update={'content': event.content.model_copy(update={'parts': parts})}))
+        await super().add_session_to_memory(session.model_copy(update={'events': text_events}))
+
+        key = (f"{session.app_name}/{session.user_id}", session.id)
+        with self._lock:
+            self._added[key] = time.time()
+            self._added.move_to_end(key)
+        self.evict()
+
+    def evict(self) -> int:
+        cutoff = time.time() - self.ttl
+        evicted = 0
+        with self._lock:
+            while self._added and (len(self._added) > self.max_sessions or next(iter(self._added.values())) < cutoff):
+                (user_key, session_id), _ = self._added.popitem(last=False)
+                sessions = self._session_events.get(user_key, {})
+                sessions.pop(session_id, None)
+                if not sessions:
+                    self._session_events.pop(user_key, None)
+                evicted += 1
+        return evicted
+
+
+class RetentionSessionService(BaseSessionService):
+    """Wraps a session service: strips binary parts before events are stored and compacts old sessions.
+
+    Compaction runs in the background. Sessions idle for longer than the TTL, or beyond the newest
+    max_sessions of an app, are archived to the memory service (text only) and deleted.
+    """
+
+    def __init__(self,
+                 inner: BaseSessionService,
+                 memory_service: Optional[BaseMemoryService] = None,
+                 ttl: float = float(os.getenv('SESSION_TTL_SECONDS', '86400')),
+                 max_sessions: int = int(os.getenv('SESSION_MAX_PER_APP', '10000')),
+                 compact_interval: float = float(os.getenv('SESSION_COMPACT_INTERVAL_SECONDS', '600'))):
+        self.inner = inner
+        self.memory_service = memory_service
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.compact_interval = compact_interval
+        self._app_names: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        self._app_names.add(app_name)
+        return await self.inner.create_session(app_name=app_name, user_id=user_id, state=state,
+                                               session_id=session_id)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        return await self.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id,
+                                            config=config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        await externalize_binary_parts(event)
+        return await self.inner.append_event(session, event)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._compact_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _compact_periodically(self):
+        while True:
+            await asyncio.sleep(self.compact_interval)
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"Session compaction failed: {type(e).__name__}: {e}")
+
+    async def compact(self) -> int:
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for app_name in sorted(self._app_names):
+            response = await self.inner.list_sessions(app_name=app_name)
+            sessions = sorted(response.sessions, key=lambda s: s.last_update_time, reverse=True)
+            for index, session in enumerate(sessions):
+                if index < self.max_sessions and session.last_update_time >= cutoff:
+                    continue
+                if self.memory_service is not None:
+                    full_session = await self.inner.get_session(app_name=app_name, user_id=session.user_id,
+                                                                session_id=session.id)
+                    if full_session is not None:
+                        await self.memory_service.add_session_to_memory(full_session)
+                await self.inner.delete_session(app_name=app_name, user_id=session.user_id, session_id=session.id)
+                removed += 1
+        if isinstance(self.memory_service, BoundedMemoryService):
+            self.memory_service.evict()
+        if removed:
+            logger.info(f"Compacted {removed} sessions")
+        return removed
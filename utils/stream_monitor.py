@@ -0,0 +1,440 @@
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+import cv2
+import httpx
+from a2a.server.tasks import BasePushNotificationSender, InMemoryPushNotificationConfigStore
+from a2a.types import (Artifact, DataPart, Part, PushNotificationConfig, Task, TaskState, TaskStatus)
+
+from utils.frame_sampler import FRAME_SET_MIME_TYPE
+from utils.hazard_schema import SEVERITY_RANK, Severity, merge_reports
+from utils.media_store import media_store
+from utils.telemetry import metrics
+
+
+class StreamStatus(str, Enum):
+    CONNECTING = "connecting"
+    RUNNING = "running"
+    RECONNECTING = "reconnecting"
+    ENDED = "ended"
+    STOPPED = "stopped"
+    FAILED = "failed"
+
+
+# Network sources OpenCV reads; anything else must be a file under the artifact directory
+_NETWORK_SOURCE_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https")
+
+# Final A2A task state pushed when monitoring ends
+_FINAL_TASK_STATES = {StreamStatus.ENDED: TaskState.completed, StreamStatus.STOPPED: TaskState.canceled,
+                      StreamStatus.FAILED: TaskState.failed}
+
+
+@dataclass
+class _Frame:
+    timestamp: float
+    jpeg: bytes
+
+
+@dataclass
+class Stream:
+    id: str
+    source: str
+    replay: bool
+    status: StreamStatus = StreamStatus.CONNECTING
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    frames_read: int = 0
+    frames_forwarded: int = 0
+    frames_dropped: int = 0
+    windows_analysed: int = 0
+    windows_dropped: int = 0
+    error: Optional[str] = None
+    # How the reader ended (ended or failed); _finish applies it once the last window is analysed
+    end_status: Optional[StreamStatus] = None
+    alerts: deque = field(default_factory=lambda: deque(maxlen=int(os.getenv("STREAM_ALERT_HISTORY", "100"))))
+    last_alert_at: dict[str, float] = field(default_factory=dict)
+    tasks: list[asyncio.Task] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.status in _FINAL_TASK_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "stream_id": self.id,
+            "source": self.source,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "frames_read": self.frames_read,
+            "frames_forwarded": self.frames_forwarded,
+            "frames_dropped": self.frames_dropped,
+            "windows_analysed": self.windows_analysed,
+            "windows_dropped": self.windows_dropped,
+            "error": self.error,
+            "alerts": list(self.alerts),
+        }
+
+
+class StreamManager:
+    """Continuous hazard monitoring of live camera streams (RTSP, HLS, or a local file replayed in real time).
+
+    Each stream runs three stages joined by bounded queues. The reader samples a frame every probe interval and
+    forwards it only when the scene changed since the last forwarded frame; when the frame buffer is full the
+    oldest frame is dropped rather than letting the reader fall behind the live stream. The windower groups
+    forwarded frames into rolling windows written as frame sets, and the analyser sends each window to the
+    hazard agents through the handler. A window arriving while the analyser is busy replaces the oldest pending
+    one, so analysis always works on recent footage. Findings at or above the alert severity are pushed to the
+    stream's A2A push-notification URL as updates of one long-running task, at most once per category per
+    cooldown.
+    """
+
+    def __init__(self,
+                 handler: Callable[[str, str], Awaitable[dict]],
+                 root_dir: str = os.getenv("ARTIFACT_DIR", "artifacts"),
+                 probe_interval: float = float(os.getenv("STREAM_PROBE_SECONDS", "0.5")),
+                 scene_threshold: float = float(os.getenv("STREAM_SCENE_THRESHOLD", "0.3")),
+                 window_seconds: float = float(os.getenv("STREAM_WINDOW_SECONDS", "10")),
+                 window_max_frames: int = int(os.getenv("STREAM_WINDOW_MAX_FRAMES", "8")),
+                 buffer_frames: int = int(os.getenv("STREAM_BUFFER_FRAMES", "32")),
+                 pending_windows: int = int(os.getenv("STREAM_PENDING_WINDOWS", "2")),
+                 max_streams: int = int(os.getenv("STREAM_MAX_STREAMS", "8")),
+                 alert_severity: str = os.getenv("STREAM_ALERT_SEVERITY", "high"),
+                 alert_cooldown: float = float(os.getenv("STREAM_ALERT_COOLDOWN_SECONDS", "60")),
+                 reconnect_delay: float = float(os.getenv("STREAM_RECONNECT_SECONDS", "5")),
+                 max_reconnects: int = int(os.getenv("STREAM_MAX_RECONNECTS", "10")),
+                 retention: float = float(os.getenv("STREAM_RETENTION_SECONDS", "3600")),
+                 push_allowed_hosts: str = os.getenv("STREAM_PUSH_ALLOWED_HOSTS", ""),
+                 max_width: int = int(os.getenv("FRAME_MAX_WIDTH", "768")),
+                 jpeg_quality: int = 80):
+        self.handler = handler
+        self.stream_dir = Path(root_dir).expanduser().resolve() / "streams"
+        self.probe_interval = probe_interval
+        self.scene_threshold = scene_threshold
+        self.window_seconds = window_seconds
+        self.window_max_frames = window_max_frames
+        self.buffer_frames = buffer_frames
+        self.pending_windows = pending_windows
+        self.max_streams = max_streams
+        self.alert_rank = SEVERITY_RANK[Severity(alert_severity)]
+        self.alert_cooldown = alert_cooldown
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnects = max_reconnects
+        self.retention = retention
+        self.push_allowed_hosts = {host.strip().lower() for host in push_allowed_hosts.split(",") if host.strip()}
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self.streams: dict[str, Stream] = {}
+        self._push_configs = InMemoryPushNotificationConfigStore()
+        self._push_client: Optional[httpx.AsyncClient] = None
+        self._push_sender: Optional[BasePushNotificationSender] = None
+
+    def get(self, stream_id: str) -> Optional[Stream]:
+        return self.streams.get(stream_id)
+
+    def active(self) -> int:
+        return sum(1 for stream in self.streams.values() if not stream.done)
+
+    async def start_stream(self, source: str, push_url: Optional[str] = None, push_token: Optional[str] = None,
+                           replay: bool = False) -> Stream:
+        """Starts monitoring a stream; raises RuntimeError when STREAM_MAX_STREAMS are already running and
+        ValueError for a source or push URL it may not use."""
+        self._prune()
+        if self.active() >= self.max_streams:
+            raise RuntimeError(f"Already monitoring {self.max_streams} streams")
+        if urlparse(source).scheme.lower() not in _NETWORK_SOURCE_SCHEMES:
+            source = str(media_store.resolve(source))
+        if push_url:
+            await self._check_push_url(push_url)
+        stream = Stream(id=str(uuid.uuid4()), source=source, replay=replay)
+        if push_url:
+            await self._push_configs.set_info(stream.id, PushNotificationConfig(url=push_url, token=push_token))
+        self.streams[stream.id] = stream
+
+        frames: asyncio.Queue[Optional[_Frame]] = asyncio.Queue(maxsize=self.buffer_frames)
+        windows: asyncio.Queue[Optional[Path]] = asyncio.Queue(maxsize=self.pending_windows)
+        stream.tasks = [asyncio.create_task(self._read(stream, frames)),
+                        asyncio.create_task(self._window(stream, frames, windows)),
+                        asyncio.create_task(self._analyse(stream, windows))]
+        logging.info(f"Monitoring stream {stream.id} from {source}")
+        return stream
+
+    async def _check_push_url(self, push_url: str):
+        """Refuses push URLs that would make the server post to itself or its private network.
+
+        With STREAM_PUSH_ALLOWED_HOSTS set only those hosts are accepted. Otherwise every address the host
+        resolves to must be public. The name is resolved again when the push is sent, so deployments exposed
+        to untrusted callers should set the allow-list.
+        """
+        parsed = urlparse(push_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"Push URL must be an http(s) URL: {push_url}")
+        host = parsed.hostname.lower()
+        if self.push_allowed_hosts:
+            if host not in self.push_allowed_hosts:
+                raise ValueError(f"Push host {host} is not in STREAM_PUSH_ALLOWED_HOSTS")
+            return
+        try:
+            addresses = await asyncio.get_running_loop().getaddrinfo(host, parsed.port or 443, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise ValueError(f"Cannot resolve push host {host}: {e}")
+        for *_, sockaddr in addresses:
+            if not ipaddress.ip_address(sockaddr[0]).is_global:
+                raise ValueError(f"Push host {host} resolves to non-public address {sockaddr[0]}")
+
+    async def stop_stream(self, stream: Stream):
+        for task in stream.tasks:
+            task.cancel()
+        await asyncio.gather(*stream.tasks, return_exceptions=True)
+        if stream.finished_at is None:
+            # A source that already ended or failed keeps that status; its last windows are simply not analysed
+            await self._finish(stream, stream.end_status or StreamStatus.STOPPED)
+
+    async def stop(self):
+        """Stops every stream and closes the push-notification client."""
+        await asyncio.gather(*(self.stop_stream(stream) for stream in list(self.streams.values())))
+        if self._push_client is not None:
+            await self._push_client.aclose()
+            self._push_client = None
+            self._push_sender = None
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for stream_id, stream in list(self.streams.items()):
+            if stream.finished_at is not None and stream.finished_at < cutoff:
+                del self.streams[stream_id]
+
+    @staticmethod
+    def _put_latest(queue: asyncio.Queue, item) -> bool:
+        """Queues the item, dropping the oldest one when the queue is full; True when something was dropped."""
+        dropped = False
+        while queue.full():
+            queue.get_nowait()
+            dropped = True
+        queue.put_nowait(item)
+        return dropped
+
+    def _next_frame_sync(self, capture: cv2.VideoCapture, stream: Stream, clock: dict,
+                         stopping: threading.Event) -> Optional[tuple]:
+        """Grabs frames until the next probe is due and decodes that one; None when the stream ended."""
+        while capture.grab():
+            stream.frames_read += 1
+            if stream.replay:
+                # A file plays back at its own pace, as a camera would deliver it
+                timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                delay = clock['started'] + timestamp - time.monotonic()
+                if delay > 0 and stopping.wait(delay):
+                    return None
+            else:
+                timestamp = time.monotonic() - clock['started']
+            if timestamp < clock['next_probe']:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                return None
+            clock['next_probe'] = timestamp + self.probe_interval
+            return timestamp, frame
+        return None
+
+    def _encode_if_changed_sync(self, frame, clock: dict) -> Optional[bytes]:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        histogram = cv2.calcHist([gray], [0], None, [64], [0, 256])
+        histogram = cv2.normalize(histogram, histogram)
+        previous = clock.get('histogram')
+        if previous is not None and cv2.compareHist(previous, histogram, cv2.HISTCMP_BHATTACHARYYA) <= self.scene_threshold:
+            return None
+        clock['histogram'] = histogram
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(height * self.max_width / width)), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return jpeg.tobytes() if ok else None
+
+    def _read_sync(self, stream: Stream, emit: Callable[[_Frame], None], stopping: threading.Event):
+        """Reads the stream on one thread, which alone owns the capture, reconnecting live sources that drop."""
+        reconnects = 0
+        clock = {'started': time.monotonic(), 'next_probe': 0.0}
+        while not stopping.is_set():
+            capture = cv2.VideoCapture(stream.source)
+            # Live sources should hand over the newest frame, not one queued in the backend
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            try:
+                if capture.isOpened():
+                    stream.status = StreamStatus.RUNNING
+                    while not stopping.is_set() and (sampled := self._next_frame_sync(capture, stream, clock, stopping)):
+                        reconnects = 0
+                        timestamp, frame = sampled
+                        jpeg = self._encode_if_changed_sync(frame, clock)
+                        if jpeg is not None:
+                            stream.frames_forwarded += 1
+                            emit(_Frame(timestamp=round(timestamp, 2), jpeg=jpeg))
+            finally:
+                capture.release()
+
+            if stopping.is_set():
+                return
+            if stream.replay:
+                stream.end_status = StreamStatus.ENDED
+                return
+            reconnects += 1
+            if reconnects > self.max_reconnects:
+                stream.end_status = StreamStatus.FAILED
+                stream.error = f"Stream unavailable after {self.max_reconnects} reconnects"
+                return
+            stream.status = StreamStatus.RECONNECTING
+            logging.warning(f"Stream {stream.id} interrupted, reconnecting in {self.reconnect_delay}s")
+            stopping.wait(self.reconnect_delay)
+
+    async def _read(self, stream: Stream, frames: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        stopping = threading.Event()
+
+        def buffer(frame: _Frame):
+            if self._put_latest(frames, frame):
+                stream.frames_dropped += 1
+                metrics.increment('stream_frames_dropped_total')
+
+        try:
+            await asyncio.to_thread(self._read_sync, stream,
+                                    lambda frame: loop.call_soon_threadsafe(buffer, frame), stopping)
+        finally:
+            stopping.set()
+            # Flush the last window and let the analyser finish
+            loop.call_soon(self._put_latest, frames, None)
+
+    def _write_window_sync(self, stream: Stream, window: list[_Frame]) -> Path:
+        if len(window) > self.window_max_frames:
+            step = len(window) / self.window_max_frames
+            window = [window[int(i * step)] for i in range(self.window_max_frames)]
+        # The directory name is the window's content key for the result cache, so it must identify the frames
+        # themselves; a per-stream counter would serve one stream's results for another's windows
+        digest = hashlib.sha256()
+        for frame in window:
+            digest.update(f"{frame.timestamp}:".encode())
+            digest.update(frame.jpeg)
+        target_dir = self.stream_dir / stream.id / digest.hexdigest()
+        target_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for position, frame in enumerate(window):
+            frame_path = target_dir / f"{position:05d}.jpg"
+            frame_path.write_bytes(frame.jpeg)
+            entries.append({"uri": frame_path.as_uri(), "mime_type": "image/jpeg", "timestamp": frame.timestamp})
+        manifest_path = target_dir / "manifest.json"
+        manifest_path.write_text(json.dumps({
+            "source_uri": stream.source,
+            "start": window[0].timestamp,
+            "end": window[-1].timestamp,
+            "duration": round(window[-1].timestamp - window[0].timestamp, 2),
+            "frames": entries,
+        }))
+        return manifest_path
+
+    async def _emit_window(self, stream: Stream, window: list[_Frame], windows: asyncio.Queue):
+        manifest_path = await asyncio.to_thread(self._write_window_sync, stream, window)
+        if self._put_latest(windows, manifest_path):
+            stream.windows_dropped += 1
+            metrics.increment('stream_windows_dropped_total')
+
+    async def _window(self, stream: Stream, frames: asyncio.Queue, windows: asyncio.Queue):
+        window: list[_Frame] = []
+        closes_at = 0.0
+        try:
+            while True:
+                if not window:
+                    frame = await frames.get()
+                    closes_at = time.monotonic() + self.window_seconds
+                else:
+                    try:
+                        # A static scene forwards no more frames, so the window also closes on the clock
+                        frame = await asyncio.wait_for(frames.get(), max(closes_at - time.monotonic(), 0))
+                    except asyncio.TimeoutError:
+                        await self._emit_window(stream, window, windows)
+                        window = []
+                        continue
+                if frame is not None:
+                    window.append(frame)
+                if window and (frame is None or frame.timestamp - window[0].timestamp >= self.window_seconds):
+                    await self._emit_window(stream, window, windows)
+                    window = []
+                if frame is None:
+                    return
+        finally:
+            self._put_latest(windows, None)
+
+    async def _analyse(self, stream: Stream, windows: asyncio.Queue):
+        try:
+            while (manifest_path := await windows.get()) is not None:
+                start = time.perf_counter()
+                try:
+                    results = await self.handler(manifest_path.as_uri(), FRAME_SET_MIME_TYPE)
+                    stream.windows_analysed += 1
+                    await self._alert(stream, merge_reports(results))
+                except Exception as e:
+                    logging.error(f"Analysis of stream {stream.id} window failed: {type(e).__name__}: {e}")
+                finally:
+                    metrics.observe('stream_window_duration_seconds', time.perf_counter() - start)
+                    # Windows are transient; the alerts carry what was found
+                    await asyncio.to_thread(shutil.rmtree, manifest_path.parent, True)
+            await self._finish(stream, stream.end_status or StreamStatus.ENDED)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stream.error = f"{type(e).__name__}: {e}"
+            await self._finish(stream, StreamStatus.FAILED)
+
+    async def _alert(self, stream: Stream, merged: dict):
+        now = time.time()
+        for category, findings in merged['categories'].items():
+            # Findings are ordered by severity, so the first one is the worst in its category
+            worst = findings[0]
+            if SEVERITY_RANK[Severity(worst['severity'])] > self.alert_rank:
+                continue
+            if now - stream.last_alert_at.get(category, 0.0) < self.alert_cooldown:
+                continue
+            stream.last_alert_at[category] = now
+            alert = {"stream_id": stream.id, "category": category, "detected_at": now} | worst
+            stream.alerts.append(alert)
+            metrics.increment('stream_alerts_total', category=category, severity=worst['severity'])
+            logging.warning(f"Hazard alert on stream {stream.id}: {category} {worst['severity']}: {worst['description']}")
+            await self._push(stream, TaskState.working, alert)
+
+    async def _finish(self, stream: Stream, status: StreamStatus):
+        """The only place a stream reaches a final status, so finished_at and the final push always go with it."""
+        stream.status = status
+        stream.finished_at = time.time()
+        logging.info(f"Stream {stream.id} {status.value}")
+        await self._push(stream, _FINAL_TASK_STATES[status])
+        await self._push_configs.delete_info(stream.id)
+
+    async def _push(self, stream: Stream, state: TaskState, alert: Optional[dict] = None):
+        """Sends the monitoring task's current state, with the alert as a DataPart artifact, to the push URL."""
+        if not await self._push_configs.get_info(stream.id):
+            return
+        if self._push_sender is None:
+            self._push_client = httpx.AsyncClient(timeout=10)
+            self._push_sender = BasePushNotificationSender(self._push_client, self._push_configs)
+        task = Task(id=stream.id, context_id=stream.id,
+                    status=TaskStatus(state=state, timestamp=datetime.now(timezone.utc).isoformat()))
+        if alert is not None:
+            task.artifacts = [Artifact(artifact_id=str(uuid.uuid4()), name="hazard_alert",
+                                       parts=[Part(root=DataPart(data=alert))])]
+        else:
+            # The final update carries the stream's counters instead
+            task.metadata = {key: value for key, value in stream.to_dict().items() if key != "alerts"}
+        await self._push_sender.send_notification(task)
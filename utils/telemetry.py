@@ -0,0 +1,130 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+# A proxy until setup_tracing installs the SDK provider; spans started before then are not recorded
+tracer = trace.get_tracer("a2a_adk_agents_poc")
+
+
+def setup_tracing(service_name: str, exporter: str = os.getenv("OTEL_TRACES_EXPORTER", "none")) -> TracerProvider:
+    """Installs the process's tracer provider, exporting spans to OTLP, the console, or nowhere.
+
+    Spans are recorded even with no exporter, so trace context still propagates to the MCP server and the
+    agents. The OTLP exporter reads its endpoint from OTEL_EXPORTER_OTLP_ENDPOINT. Only the first call in a
+    process takes effect, so servers started in one process (the benchmark) share one provider.
+    """
+    if exporter not in ("otlp", "console", "none"):
+        raise ValueError(f"Unknown OTEL_TRACES_EXPORTER {exporter}; use otlp, console or none")
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        return provider
+    provider = TracerProvider(resource=Resource.create({SERVICE_NAME: service_name}))
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    elif exporter == "console":
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    trace.set_tracer_provider(provider)
+    logging.info(f"Tracing {service_name} with exporter {exporter}")
+    return provider
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Summary:
+    def __init__(self, window: int):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return float("nan")
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class MetricsRegistry:
+    """In-process latency summaries and counters rendered in the Prometheus text format."""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._summaries: dict[str, dict[tuple, _Summary]] = defaultdict(dict)
+        self._counters: dict[str, dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            summary = self._summaries[name].get(key)
+            if summary is None:
+                summary = self._summaries[name][key] = _Summary(self.window)
+            summary.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[name][tuple(sorted(labels.items()))] += value
+
+    @staticmethod
+    def _labels(key: tuple, **extra) -> str:
+        pairs = list(key) + sorted(extra.items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._summaries.items()):
+                lines.append(f"# TYPE {name} summary")
+                for key, summary in series.items():
+                    for q in QUANTILES:
+                        lines.append(f"{name}{self._labels(key, quantile=q)} {summary.quantile(q):.6f}")
+                    lines.append(f"{name}_sum{self._labels(key)} {summary.total:.6f}")
+                    lines.append(f"{name}_count{self._labels(key)} {summary.count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{self._labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def inject_trace_context() -> dict:
+    """Serializes the current trace context (traceparent) for MCP arguments and A2A metadata."""
+    carrier: dict = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def extract_trace_context(carrier: Optional[dict]) -> Context:
+    return propagate.extract(carrier or {})
+
+
+@contextmanager
+def traced(span_name: str, metric: str, context: Optional[Context] = None, **labels) -> Iterator[trace.Span]:
+    """Runs the block in a span and records its duration in the named latency summary."""
+    start = time.perf_counter()
+    with tracer.start_as_current_span(span_name, context=context, attributes=labels) as span:
+        try:
+            yield span
+        finally:
+            metrics.observe(metric, time.perf_counter() - start, **labels)
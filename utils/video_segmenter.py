@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from utils.frame_sampler import FRAME_SET_MIME_TYPE, FrameSampler
+from utils.media_store import MediaRef, media_store
+
+SEGMENT_SET_MIME_TYPE = "application/vnd.segment-set+json"
+
+
+@dataclass(frozen=True)
+class Segment:
+    index: int
+    start: float
+    end: float
+
+
+def plan_segments(duration: float, segment_seconds: float, overlap_seconds: float) -> list[Segment]:
+    """Overlapping [start, end) windows covering the whole duration; the overlap keeps events on a boundary whole."""
+    overlap_seconds = min(overlap_seconds, segment_seconds / 2)
+    segments = []
+    start = 0.0
+    while True:
+        end = min(start + segment_seconds, duration)
+        segments.append(Segment(index=len(segments), start=round(start, 2), end=round(end, 2)))
+        if end >= duration:
+            return segments
+        start = end - overlap_seconds
+
+
+class VideoSegmenter:
+    """Splits a long video into overlapping time windows, each sampled into its own frame set.
+
+    The windows are decoded in parallel, each seeking to its own start, and listed in a segment-set manifest
+    so the host can analyse them concurrently and merge the findings into one timeline.
+    """
+
+    def __init__(self,
+                 root_dir: str = os.getenv("ARTIFACT_DIR", "artifacts"),
+                 segment_seconds: float = float(os.getenv("SEGMENT_SECONDS", "60")),
+                 overlap_seconds: float = float(os.getenv("SEGMENT_OVERLAP_SECONDS", "5")),
+                 workers: int = int(os.getenv("SEGMENT_SAMPLING_WORKERS", "4"))):
+        self.segment_dir = Path(root_dir).expanduser().resolve() / "segments"
+        self.segment_seconds = segment_seconds
+        self.overlap_seconds = overlap_seconds
+        self.workers = workers
+
+    async def segment(self, media: MediaRef, duration: float, sampler: FrameSampler) -> MediaRef:
+        """Returns a segment-set reference whose segments are frame sets sampled by the given sampler."""
+        params = f"{sampler.cache_key(media.sha256)}:{self.segment_seconds}:{self.overlap_seconds}"
+        manifest_path = self.segment_dir / f"{media.sha256}-{hashlib.sha256(params.encode()).hexdigest()[:8]}" / "manifest.json"
+        if manifest_path.exists():
+            logging.info(f"Reusing cached segment set for {media.sha256}")
+            return MediaRef(sha256=media.sha256, uri=manifest_path.as_uri(), mime_type=SEGMENT_SET_MIME_TYPE,
+                            size=manifest_path.stat().st_size)
+
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def sample(segment: Segment) -> MediaRef:
+            async with semaphore:
+                return await asyncio.to_thread(sampler.sample_sync, media, segment.start, segment.end)
+
+        segments = plan_segments(duration, self.segment_seconds, self.overlap_seconds)
+        frame_sets = await asyncio.gather(*(sample(segment) for segment in segments))
+
+        entries = []
+        for segment, frame_set in zip(segments, frame_sets):
+            if frame_set.mime_type != FRAME_SET_MIME_TYPE:
+                logging.warning(f"No frames decoded for segment {segment.index} of {media.sha256}, skipping it")
+                continue
+            entries.append({"index": segment.index, "start": segment.start, "end": segment.end,
+                            "uri": frame_set.uri, "mime_type": frame_set.mime_type})
+        if not entries:
+            logging.warning(f"No segments decoded from {media.uri}, sending the original media")
+            return media
+
+        manifest = {
+            "source_sha256": media.sha256,
+            "source_uri": media.uri,
+            "source_mime_type": media.mime_type,
+            "duration": round(duration, 2),
+            "segment_seconds": self.segment_seconds,
+            "overlap_seconds": self.overlap_seconds,
+            "segments": entries,
+        }
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest))
+        logging.info(f"Split {media.sha256} into {len(entries)} segments of {self.segment_seconds}s")
+        return MediaRef(sha256=media.sha256, uri=manifest_path.as_uri(), mime_type=SEGMENT_SET_MIME_TYPE,
+                        size=manifest_path.stat().st_size)
+
+
+def load_segment_set(uri: str) -> dict:
+    with open(media_store.resolve(uri)) as manifest:
+        return json.load(manifest)
+
+
+video_segmenter = VideoSegmenter()